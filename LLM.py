@@ -1,71 +1,23 @@
-#Merge both marksheet csv files which are gernerated by OCR
-
-import pandas as pd
-m1 = pd.read_csv('/content/marksheet_marks (5).csv')
-m2 = pd.read_csv('/content/marksheet_marks (7).csv')
-
-# Assign a unique student ID to each marksheet before merging
-m1['id'] = 1 # Assuming this marksheet is for student_id 1
-m2['id'] = 2 # Assuming this marksheet is for student_id 2
-
-# Concatenate the dataframes. Now both have an 'id' column.
-merged = pd.concat([m1, m2], axis=0, ignore_index=True)
-merged.to_csv('marksheet_merged.csv', index=False)
+#Marksheet CSVs for several students are produced in one go by batch_ocr.py,
+#which adds an 'id' column per student:
+#   python batch_ocr.py scans/ -o marksheet_merged.csv
 
 
 
 #LLM Model
 
 
+import numpy as np
 import pandas as pd
+from field_weights import load_weights
+from subjects import subject_scores
 
 # ----------------------------------------------
-# SUBFIELDS FOR EACH FIELD
+# FIELDS, WEIGHTS & SUBFIELDS
 # ----------------------------------------------
-SUBFIELDS = {
-    "Engineering": [
-        "Mechanical Engineering",
-        "Electrical Engineering",
-        "Civil Engineering",
-        "Software Engineering",
-        "Chemical Engineering"
-    ],
-    "Medical": [
-        "MBBS",
-        "Pharmacy",
-        "Physiotherapy",
-        "Nursing",
-        "Biotechnology"
-    ],
-    "Computer Science": [
-        "Artificial Intelligence",
-        "Data Science",
-        "Cyber Security",
-        "Software Development",
-        "IT Management"
-    ],
-    "Business": [
-        "BBA",
-        "Marketing",
-        "Finance",
-        "HR Management",
-        "Supply Chain"
-    ],
-    "Arts": [
-        "Psychology",
-        "Fine Arts",
-        "Mass Communication",
-        "English Literature",
-        "Sociology"
-    ],
-    "Commerce": [
-        "B.Com",
-        "Accounting",
-        "Banking",
-        "Economics",
-        "Business Administration"
-    ]
-}
+# Weights and subfields live in field_weights.json (see field_weights.py)
+WEIGHTS = load_weights()
+SUBFIELDS = WEIGHTS.subfields
 
 # ----------------------------------------------
 # LOAD PERSONALITY TEST (RIASEC + TCI)
@@ -80,7 +32,11 @@ def load_personality(csv_path):
 # LOAD MARKSHEET & CONVERT TO WIDE FORMAT
 # ----------------------------------------------
 def load_marksheet(csv_path):
-    df = pd.read_csv(csv_path)
+    return clean_marksheet(pd.read_csv(csv_path))
+
+
+def clean_marksheet(df):
+    """OCR marks table (Subject / Obtained columns) -> one max mark per subject."""
     df = df.rename(columns={"Obtained": "marks", "Subject": "subject"})
     df = df[["subject", "marks"]]    # Only two columns needed
     df = df[~df["subject"].str.contains("TOTAL", case=False)]  # remove TOTAL rows
@@ -93,29 +49,8 @@ def load_marksheet(csv_path):
 # EXTRACT SUBJECT SCORES (MATH / PHY / ENG etc.)
 # ----------------------------------------------
 def extract_subject_scores(df):
-    subjects = {
-        "math": ["MATH", "MATHEMATICS"],
-        "physics": ["PHYSICS"],
-        "chemistry": ["CHEMISTRY"],
-        "biology": ["BIOLOGY"],
-        "computer": ["COMPUTER"],
-        "english": ["ENGLISH"],
-        "urdu": ["URDU"],
-        "islamiat": ["ISLAM", "ISLAMIYAT"],
-        "pakstudies": ["PAKISTAN"]
-    }
-
-    extracted = {}
-
-    for key, keywords in subjects.items():
-        extracted[key] = 0  # default
-        for kw in keywords:
-            row = df[df["subject"].str.contains(kw, case=False)]
-            if len(row) > 0:
-                extracted[key] = int(row.iloc[0]["marks"])
-                break
-
-    return extracted
+    # One pass over the marksheet with the compiled subject index (subjects.py)
+    return subject_scores(df).iloc[0].to_dict()
 
 
 # ----------------------------------------------
@@ -128,49 +63,95 @@ def calculate_best_fit(marks, personality):
     Returns: dict of normalized probabilities for each field
     """
 
-    # Initialize raw scores
-    scores = {
-        "Medical": 0,
-        "Engineering": 0,
-        "Computer Science": 0,
-        "Arts": 0,
-        "Business": 0,
-        "Commerce": 0
-    }
-
-    # -------------------------
-    # MARKS WEIGHTS (field relevance)
-    # -------------------------
-    scores["Medical"] += (marks["biology"]/150)*0.35 + (marks["chemistry"]/150)*0.35 + (marks["physics"]/150)*0.1 + (marks["math"]/150)*0.1 + (marks["english"]/150)*0.05 + (marks["urdu"]/150)*0.05
-    scores["Engineering"] += (marks["math"]/150)*0.35 + (marks["physics"]/150)*0.35 + (marks["chemistry"]/150)*0.1 + (marks["biology"]/150)*0.05 + (marks["english"]/150)*0.05 + (marks["urdu"]/150)*0.1
-    scores["Computer Science"] += (marks["math"]/150)*0.3 + (marks["physics"]/150)*0.2 + (marks["computer"]/150)*0.25 + (marks["english"]/150)*0.1 + (marks["biology"]/150)*0.05 + (marks["urdu"]/150)*0.1
-    scores["Arts"] += (marks["english"]/150)*0.4 + (marks["urdu"]/150)*0.3 + (marks["biology"]/150)*0.05 + (marks["chemistry"]/150)*0.05 + (marks["math"]/150)*0.1 + (marks["physics"]/150)*0.1
-    scores["Business"] += (marks["math"]/150)*0.2 + (marks["english"]/150)*0.3 + (marks["urdu"]/150)*0.2 + (marks["biology"]/150)*0.05 + (marks["chemistry"]/150)*0.05 + (marks["physics"]/150)*0.2
-    scores["Commerce"] += (marks["math"]/150)*0.3 + (marks["english"]/150)*0.25 + (marks["urdu"]/150)*0.2 + (marks["biology"]/150)*0.05 + (marks["chemistry"]/150)*0.05 + (marks["physics"]/150)*0.15
-
-    # -------------------------
-    # PERSONALITY / RIASEC WEIGHTS
-    # personality scores assumed 0-5 scale
-    # -------------------------
-    scores["Medical"] += ((personality.get("riasec_I",0) + personality.get("riasec_A",0))/10) * 0.3
-    scores["Engineering"] += ((personality.get("riasec_I",0) + personality.get("riasec_C",0))/10) * 0.3
-    scores["Computer Science"] += ((personality.get("riasec_C",0) + personality.get("tci_NoveltySeeking",0))/10) * 0.3
-    scores["Arts"] += ((personality.get("riasec_A",0) + personality.get("riasec_E",0))/10) * 0.3
-    scores["Business"] += ((personality.get("riasec_E",0) + personality.get("tci_RewardDependence",0))/10) * 0.3
-    scores["Commerce"] += ((personality.get("riasec_E",0) + personality.get("riasec_C",0))/10) * 0.3
-
-    # -------------------------
-    # NORMALIZE SCORES TO PROBABILITIES
-    # -------------------------
-    total_score = sum(scores.values())
-    probabilities = {field: round(score/total_score, 3) for field, score in scores.items()}
-
-    # Sort by highest probability
-    probabilities = dict(sorted(probabilities.items(), key=lambda x: x[1], reverse=True))
-
-    return probabilities
+    # Scored by the batch kernel below so single students and cohorts
+    # always get identical probabilities
+    probs = score_cohort(pd.DataFrame([marks]), pd.DataFrame([personality]))
+    return rank_fields(probs)["ranking"].iloc[0]
+
 
 
+# ----------------------------------------------
+# BATCH SCORING (WHOLE COHORTS)
+# Each field's terms are applied to whole columns, one element-wise operation
+# per term in the original formula's order. A matrix multiply would let BLAS
+# regroup the additions by matrix size, so a student could score differently
+# alone than in a cohort; column by column every row is computed exactly as
+# the per-student formula did.
+# ----------------------------------------------
+FIELDS = WEIGHTS.fields
+SUBJECT_KEYS = WEIGHTS.subject_keys
+TRAIT_KEYS = WEIGHTS.trait_keys
+
+
+def _as_matrix(df, columns):
+    # Missing columns and NaNs count as 0, like personality.get(key, 0)
+    return df.reindex(columns=columns).fillna(0).to_numpy(dtype=float)
+
+
+def score_cohort(marks, personality):
+    """
+    marks: DataFrame, one row per student, columns from SUBJECT_KEYS
+    personality: DataFrame, row-aligned with marks, columns from TRAIT_KEYS
+    Returns: DataFrame of normalized probabilities (rounded like calculate_best_fit),
+             one row per student and one column per field
+    """
+    m = _as_matrix(marks, SUBJECT_KEYS) / WEIGHTS.mark_scale
+    t = _as_matrix(personality, TRAIT_KEYS)
+    raw = np.zeros((len(m), len(FIELDS)))
+    for f, (mark_terms, trait_terms) in enumerate(zip(WEIGHTS.mark_terms, WEIGHTS.trait_terms)):
+        score = raw[:, f]
+        for col, weight in mark_terms:
+            score += m[:, col] * weight
+        for weight, cols in trait_terms:
+            group = t[:, cols[0]].copy()
+            for col in cols[1:]:
+                group += t[:, col]
+            score += group / WEIGHTS.trait_scale * weight
+
+    # sum(scores.values()) adds the fields left to right; ndarray.sum pairs them
+    total = np.zeros(len(m))
+    for f in range(len(FIELDS)):
+        total += raw[:, f]
+    # Python's round, not np.round (which rounds x * 1000 and can differ in the last place)
+    probs = [[round(p, 3) for p in row] for row in (raw / total[:, None]).tolist()]
+    return pd.DataFrame(probs, index=marks.index, columns=FIELDS, dtype=float)
+
+
+def rank_fields(probs):
+    """Order each row's fields by probability (ties keep FIELDS order, as in calculate_best_fit)."""
+    order = np.argsort(-probs.to_numpy(), axis=1, kind="stable")
+    names = np.array(FIELDS)[order]
+    values = np.take_along_axis(probs.to_numpy(), order, axis=1)
+    return pd.DataFrame({
+        "best_field": names[:, 0],
+        "ranking": [dict(zip(n, v)) for n, v in zip(names.tolist(), values.tolist())],
+    }, index=probs.index)
+
+
+def load_marksheets(csv_path):
+    """Long marksheet table with an 'id' column (see batch_ocr.py) -> one row of subject scores per id."""
+    df = pd.read_csv(csv_path)
+    df = df.rename(columns={"Obtained": "marks", "Subject": "subject"})
+    df = df[~df["subject"].astype(str).str.contains("TOTAL", case=False)]
+    df["subject"] = df["subject"].astype(str).str.upper().str.strip()
+    # Same per-student dedup as load_marksheet, then every student in one pass
+    df = df.groupby(["id", "subject"], sort=True)["marks"].max().reset_index()
+    return subject_scores(df, id_col="id")
+
+
+def recommend_fields(personality_csv, marksheet_csv):
+    """Cohort version of recommend_field: one recommendation per student id."""
+    p = load_personality(personality_csv).set_index("student_id")
+    m = load_marksheets(marksheet_csv)
+    p.index = p.index.astype(str)
+    m.index = m.index.astype(str)
+    ids = m.index.intersection(p.index)
+
+    probs = score_cohort(m.loc[ids], p.loc[ids])
+    ranked = rank_fields(probs)
+    ranked["subfields"] = ranked["best_field"].map(SUBFIELDS)
+    return probs.join(ranked)
+
 
 # ----------------------------------------------
 # MAIN FUNCTION
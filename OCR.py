@@ -1,69 +1,62 @@
-!pip install paddlepaddle -i https://pypi.tuna.tsinghua.edu.cn/simple
-!pip install paddleocr opencv-python pandas
+# pip install paddlepaddle -i https://pypi.tuna.tsinghua.edu.cn/simple
+# pip install paddleocr opencv-python pandas
 
 import cv2
 import numpy as np
 import pandas as pd
-from paddleocr import PaddleOCR
 import re
+import math
+import time
+from array import array
+from ocr_pool import get_ocr_pool, OCR_KWARGS
+from ocr_backends import OCR_BACKEND
+from ocr_cache import get_ocr_cache
+from subjects import match_subject
+from preprocess import preprocess, record_stage
+from pdf_ingest import is_pdf, iter_pdf_pages
 
 # ------------------------------------------------------------
 # 1) Load & preprocess image to fix blur/noise/lighting
 # ------------------------------------------------------------
-def preprocess_image(path):
+# Resolution cap, adaptive denoise/contrast and per-stage timings live in
+# preprocess.py; the (optional) threshold mask is only built when asked for.
+def preprocess_image(path, binarize=False):
     img = cv2.imread(path)
+    if img is None:
+        raise ValueError(f"Could not read image: {path}")
 
-    # Convert to grayscale
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    img, info = preprocess(img, binarize=binarize)
 
-    # Remove noise
-    gray = cv2.bilateralFilter(gray, 9, 75, 75)
-
-    # Adaptive threshold (works for colored/noisy marksheets)
-    thresh = cv2.adaptiveThreshold(
-        gray, 255,
-        cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
-        cv2.THRESH_BINARY_INV,
-        31, 10
-    )
-
-    return img, thresh
+    return img, info.get("thresh")
 
 # ------------------------------------------------------------
 # 2) OCR detection using PaddleOCR (much more accurate)
 # ------------------------------------------------------------
-ocr = PaddleOCR(use_angle_cls=True, lang='en')
+# Engines come from the shared pool (ocr_pool.py) so importing this module
+# does not load the models; batch workers warm one engine each. The backend
+# (PaddleOCR, Tesseract or recorded tokens) is chosen in ocr_backends.py.
+# Results are cached by image content (ocr_cache.py) so repeat uploads skip OCR.
+CACHE_CONFIG = {"ocr": OCR_KWARGS, "backend": OCR_BACKEND, "parser": "OCR.parse_marks"}
+LAYOUT_CACHE_CONFIG = {"ocr": OCR_KWARGS, "backend": OCR_BACKEND, "parser": "OCR.parse_marks_layout"}
 
 def extract_text(img):
-    result = ocr.ocr(img)
-    text_data = []
-    if result and result[0]: # Check if result is not empty and has detections for the first image
-        # PaddleOCR can return a list of dictionaries with results per image, or a list of detection tuples.
-        # The 'Warning: Unrecognized item format' suggests result[0] is a dictionary.
-        if isinstance(result[0], dict) and 'rec_texts' in result[0]:
-            # If result[0] is a dictionary and contains 'rec_texts' (a list of text strings)
-            text_data = result[0]['rec_texts']
-        elif isinstance(result[0], list):
-            # Fallback for older PaddleOCR versions or different output formats
-            # where result[0] is directly a list of detection items
-            for item in result[0]:
-                # Handle potential variations in PaddleOCR output format
-                if isinstance(item, (list, tuple)) and len(item) == 3: # Format: (bbox, text_str, confidence_float)
-                    box_coords, text_str, confidence = item
-                    text_data.append(text_str)
-                elif isinstance(item, (list, tuple)) and len(item) == 2: # Format: (bbox, (text_str, confidence_float))
-                    box_coords, text_info = item
-                    if isinstance(text_info, (list, tuple)) and len(text_info) == 2:
-                        text_data.append(text_info[0])
-                    else:
-                        # Fallback if text_info is not a (text, confidence) tuple
-                        text_data.append(str(text_info))
-                else:
-                    print(f"Warning: Unrecognized item format from PaddleOCR: {item}")
-        else:
-            print(f"Warning: Unrecognized top-level item format from PaddleOCR: {result[0]}")
+    cache = get_ocr_cache()
+    key = cache.key(img, CACHE_CONFIG)
+    cached = cache.get(key)
+    if cached is not None:
+        return cached["text"]
+    text_data, boxes = _run_ocr(img)
+    cache.put(key, text_data, boxes=boxes)
     return text_data
 
+def _run_ocr(img):
+    """Returns (text_data, boxes); boxes[i] is [x0, y0, x1, y1, confidence] or None."""
+    with get_ocr_pool().engine() as ocr:
+        start = time.perf_counter()
+        text_data, boxes = ocr.recognize(img)
+        record_stage("ocr", time.perf_counter() - start)
+    return text_data, boxes
+
 # ------------------------------------------------------------
 # Helper for robust number extraction
 # ------------------------------------------------------------
@@ -79,143 +72,319 @@ def extract_number_robust(s):
     return None
 
 # ------------------------------------------------------------
-# 3) Convert extracted text into "Subject | Max | Obtained"
+# 3a) Classify every OCR token once
 # ------------------------------------------------------------
-def parse_marks(text_list):
-    subjects = []
-    maximum = []
-    obtained = []
+# Token kinds, stored one byte per token
+TOK_SKIP, TOK_SUBJECT, TOK_TOTAL, TOK_OTHER = 0, 1, 2, 3
+
+HEADER_TEXT = 'SUBJECT - WISE STATEMENT OF MARKS'
+NUMBER_RE = re.compile(r'\d+\.?\d*')
+ALPHA_RE = re.compile(r'[a-zA-Z]{2,}')
+# Keywords to ignore when identifying subjects or as noise
+FORBIDDEN_SUBJECT_KEYWORDS = frozenset({'SR.NO.', 'SR.NO', 'SUBJECTS', 'MARKS', 'MAXIMUM', 'OBTAINED', 'ANNUAL', 'NO CERTIFICATE'})
+# Single-letter/short strings often misidentified by OCR or irrelevant from the provided raw OCR (compared lower-cased)
+NOISE_WORDS = frozenset(w.lower() for w in {'L', 'E', 'a', 'b', 'c', 'd', 'f', 'g', 'h', 'i', 'j', 'k', 'l', 'm', 'n', 'o', 'p', 'q', 'r', 's', 't', 'u', 'v', 'w', 'x', 'y', 'z', '1', '2', '3', '4', '5', '6', '7', '8', '9', '100', 'FIRST'})
+# Allow specific subjects regardless of strict alpha check or length if they are explicitly known
+SPECIFIC_SUBJECTS_KEYWORDS = ("URDU", "ENGLISH", "ISLAMIYAT", "PAKISTAN STUDIES", "MATHEMATICS", "PHYSICS", "CHEMISTRY", "BIOLOGY", "TOTAL")
+
+
+def classify_tokens(text_list):
+    """
+    Single pass over the OCR tokens.
+    Returns (kinds, numbers, names, header_index):
+      kinds   - array('b') of TOK_* codes
+      numbers - array('d') with the first number in each token, NaN if none
+      names   - subject text for TOK_SUBJECT/TOK_TOTAL tokens, as OCR'd
+      header_index - index of the marks table header, -1 if absent
+    """
+    n = len(text_list)
+    kinds = array('b', bytes(n))
+    numbers = array('d', [math.nan]) * n
+    names = [None] * n
+    header_index = -1
 
-    # Find the starting point of the actual marks table
-    start_parsing_from_index = -1
     for idx, text in enumerate(text_list):
-        if 'SUBJECT - WISE STATEMENT OF MARKS' in text.upper():
-            start_parsing_from_index = idx
-            break
+        raw = text.strip()
+        upper = raw.upper()
+        if header_index == -1 and HEADER_TEXT in upper:
+            header_index = idx
 
-    if start_parsing_from_index != -1:
-        i = start_parsing_from_index + 1 # Start from the item after the header
-    else:
-        i = 0 # Fallback to start from beginning if header not found
+        match = NUMBER_RE.search(raw)
+        if match:
+            numbers[idx] = float(match.group(0))
 
-    # Keywords to ignore when identifying subjects or as noise
-    forbidden_subject_keywords = {'SR.NO.', 'SR.NO', 'SUBJECTS', 'MARKS', 'MAXIMUM', 'OBTAINED', 'ANNUAL', 'NO CERTIFICATE'}
-    # Single-letter/short strings often misidentified by OCR or irrelevant from the provided raw OCR
-    noise_words = {'L', 'E', 'a', 'b', 'c', 'd', 'f', 'g', 'h', 'i', 'j', 'k', 'l', 'm', 'n', 'o', 'p', 'q', 'r', 's', 't', 'u', 'v', 'w', 'x', 'y', 'z', '1', '2', '3', '4', '5', '6', '7', '8', '9', '100', 'FIRST'}
+        # Empty strings, known noise words and forbidden keywords are never subjects
+        if not raw or upper in FORBIDDEN_SUBJECT_KEYWORDS or raw.lower() in NOISE_WORDS or len(raw) < 2 and upper != 'TOTAL':
+            continue
+        if upper == 'TOTAL':
+            # Its numbers are sometimes out of immediate sequence, see parse_marks
+            kinds[idx] = TOK_TOTAL
+            names[idx] = raw
+            continue
+
+        # A subject should contain at least two alphabetic characters
+        kind = TOK_SUBJECT if ALPHA_RE.search(raw) else TOK_OTHER
+        if any(ss in upper for ss in SPECIFIC_SUBJECTS_KEYWORDS) or match_subject(raw)[0] is not None:
+            # OCR-mangled names ("CHEMISTY", "MATHEMATlCS") are found through the
+            # fuzzy subject index but keep their OCR text: scoring canonicalizes
+            # them (subjects.py), preferring a row that names the subject exactly
+            kind = TOK_SUBJECT
+        kinds[idx] = kind
+        if kind == TOK_SUBJECT:
+            names[idx] = raw
 
-    while i < len(text_list):
-        t1_raw = text_list[i].strip()
-        t1_upper = t1_raw.upper()
+    return kinds, numbers, names, header_index
 
-        # Skip empty strings or known noise words/forbidden keywords
-        if not t1_raw or t1_upper in forbidden_subject_keywords or t1_raw.lower() in [nw.lower() for nw in noise_words] or len(t1_raw) < 2 and not t1_upper == 'TOTAL':
+
+# ------------------------------------------------------------
+# 3b) Convert classified tokens into "Subject | Max | Obtained"
+# ------------------------------------------------------------
+# The parsers are generators yielding one (subject, maximum, obtained) row at
+# a time, so streaming callers (batch_ocr.py, PDFs page by page) never build
+# a table; parse_marks / parse_marks_layout wrap them in a DataFrame.
+MARK_COLUMNS = ["Subject", "Maximum", "Obtained"]
+
+def _marks_frame(rows):
+    columns = [list(c) for c in zip(*rows)] or [[], [], []]
+    return pd.DataFrame(dict(zip(MARK_COLUMNS, columns)))
+
+def parse_marks(text_list):
+    return _marks_frame(iter_marks(text_list))
+
+def iter_marks(text_list):
+    kinds, numbers, names, header_index = classify_tokens(text_list)
+    n = len(kinds)
+
+    # next_num[i] is the first index >= i holding a number (n if none), so the
+    # TOTAL row can jump straight from number to number
+    next_num = array('l', [n]) * (n + 1)
+    for idx in range(n - 1, -1, -1):
+        next_num[idx] = idx if numbers[idx] == numbers[idx] else next_num[idx + 1]
+
+    # Start from the item after the marks table header, or the beginning if not found
+    i = header_index + 1
+
+    while i < n:
+        kind = kinds[i]
+
+        if kind == TOK_TOTAL:
+            # For 'TOTAL', we want the largest two of the next three numbers
+            # Example: 'TOTAL', '49', '850', '426'. We want 850 and 426.
+            potential_total_nums = []
+            scan_idx = next_num[i + 1]
+            while scan_idx < n and len(potential_total_nums) < 3:
+                potential_total_nums.append((numbers[scan_idx], scan_idx))
+                scan_idx = next_num[scan_idx + 1]
+
+            if len(potential_total_nums) >= 2:
+                potential_total_nums.sort(key=lambda x: x[0], reverse=True)
+                yield names[i], int(potential_total_nums[0][0]), int(potential_total_nums[1][0])
+                # Advance past the highest index of the numbers used
+                i = max(item[1] for item in potential_total_nums[:2]) + 1
+            else:
+                i += 1
+            continue
+
+        if kind != TOK_SUBJECT:
             i += 1
             continue
 
-        # Check if t1 is a plausible subject
-        is_plausible_subject = False
-        # A subject should contain at least two alphabetic characters and not be a forbidden/noise word
-        if re.search(r'[a-zA-Z]{2,}', t1_raw) and \
-           t1_upper not in forbidden_subject_keywords and \
-           t1_raw.lower() not in [nw.lower() for nw in noise_words]:
-            is_plausible_subject = True
-
-        # Allow specific subjects regardless of strict alpha check or length if they are explicitly known
-        specific_subjects_keywords = ["URDU", "ENGLISH", "ISLAMIYAT", "PAKISTAN STUDIES", "MATHEMATICS", "PHYSICS", "CHEMISTRY", "BIOLOGY", "TOTAL"]
-        if any(ss in t1_upper for ss in specific_subjects_keywords):
-             is_plausible_subject = True
-
-        if is_plausible_subject:
-            subject_name = t1_raw
-
-            # Special handling for 'TOTAL' as its numbers are sometimes out of immediate sequence
-            if t1_upper == 'TOTAL':
-                potential_total_nums = []
-                scan_idx = i + 1
-                while scan_idx < len(text_list) and len(potential_total_nums) < 3: # Scan up to 3 numbers for safety
-                    num = extract_number_robust(text_list[scan_idx])
-                    if num is not None:
-                        potential_total_nums.append((num, scan_idx)) # Store number and its original index
-                    scan_idx += 1
-
-                if len(potential_total_nums) >= 2:
-                    # For 'TOTAL', we want the largest two numbers (Total Max and Total Obtained)
-                    # Example: 'TOTAL', '49', '850', '426'. We want 850 and 426.
-                    # Sort by value to easily pick the max and obtained
-                    potential_total_nums.sort(key=lambda x: x[0], reverse=True)
-
-                    subjects.append(subject_name)
-                    maximum.append(int(potential_total_nums[0][0])) # Largest number
-                    obtained.append(int(potential_total_nums[1][0])) # Second largest number
-
-                    # Advance 'i' past the highest index of the numbers used
-                    max_k_used = max(item[1] for item in potential_total_nums[:2])
-                    i = max_k_used + 1
-                else:
-                    i += 1 # Not enough numbers for total, skip
-                continue
-
-            # For regular subjects, look for two numbers immediately after the subject name
-            found_nums = []
-            last_num_idx = i
-            scan_idx = i + 1
-            num_search_count = 0 # To limit how far we scan for numbers
-            while scan_idx < len(text_list) and len(found_nums) < 2 and num_search_count < 4: # Scan up to 4 items ahead
-                num = extract_number_robust(text_list[scan_idx])
-                if num is not None and num >= 0:
-                    # Heuristic to skip potential serial numbers (small number after Max and before another mark)
-                    if len(found_nums) == 1 and num < 10 and (scan_idx + 1 < len(text_list)) and extract_number_robust(text_list[scan_idx+1]) is not None:
-                        print(f"Skipping potential serial number: {num} for subject {subject_name}") # For debugging
-                        # Don't append, just advance scan_idx
-                    else:
-                        found_nums.append(num)
-                    last_num_idx = scan_idx
-                scan_idx += 1
-                num_search_count += 1
-
-            if len(found_nums) >= 2: # Ensure at least two numbers are found
-                subjects.append(subject_name)
-                maximum.append(int(found_nums[0]))
-                obtained.append(int(found_nums[1]))
-                i = last_num_idx + 1 # Advance index past the last number used
-            else:
-                i += 1 # Not enough numbers for subject marks, advance one position
+        # For regular subjects, look for two numbers within the next 4 items
+        found_nums = []
+        last_num_idx = i
+        scan_end = min(i + 5, n)
+        scan_idx = i + 1
+        while scan_idx < scan_end and len(found_nums) < 2:
+            num = numbers[scan_idx]
+            if num == num:
+                # Heuristic to skip potential serial numbers (small number after Max and before another mark)
+                next_is_num = scan_idx + 1 < n and numbers[scan_idx + 1] == numbers[scan_idx + 1]
+                if not (len(found_nums) == 1 and num < 10 and next_is_num):
+                    found_nums.append(num)
+                last_num_idx = scan_idx
+            scan_idx += 1
+
+        if len(found_nums) >= 2:
+            yield names[i], int(found_nums[0]), int(found_nums[1])
+            i = last_num_idx + 1
+        else:
+            i += 1
+
+# ------------------------------------------------------------
+# 3c) Layout-aware parsing from OCR bounding boxes
+# ------------------------------------------------------------
+# Tokens are grouped into table rows by vertical position and read left to
+# right, so serial numbers (left of the subject) and out-of-sequence totals
+# need no look-ahead heuristics. When the header row has MAXIMUM/OBTAINED
+# labels, numbers are assigned to the nearest of those columns.
+
+def group_rows(boxes):
+    """Indices of boxed tokens grouped into rows (top to bottom, each left to right)."""
+    order = [i for i, b in enumerate(boxes) if b is not None]
+    if not order:
+        return []
+    heights = sorted(boxes[i][3] - boxes[i][1] for i in order)
+    # Tokens whose centres are within half a typical line height share a row
+    tolerance = max(heights[len(heights) // 2], 1.0) / 2
+    order.sort(key=lambda i: (boxes[i][1] + boxes[i][3]) / 2)
+
+    rows, current, row_y = [], [], None
+    for i in order:
+        y = (boxes[i][1] + boxes[i][3]) / 2
+        if current and y - row_y > tolerance:
+            rows.append(current)
+            current = []
+        if not current:
+            row_y = y
+        current.append(i)
+        row_y += (y - row_y) / len(current)  # running mean of the row's centres
+    rows.append(current)
+    return [sorted(row, key=lambda i: boxes[i][0]) for row in rows]
+
+
+def _column_centres(text_list, boxes, rows):
+    # x centres of the "MAXIMUM" and "OBTAINED" header cells, if present
+    for row in rows:
+        max_x = obt_x = None
+        for i in row:
+            upper = text_list[i].upper()
+            centre = (boxes[i][0] + boxes[i][2]) / 2
+            if 'MAX' in upper:
+                max_x = centre
+            elif 'OBTAIN' in upper:
+                obt_x = centre
+        if max_x is not None and obt_x is not None:
+            return max_x, obt_x
+    return None
+
+
+def parse_marks_layout(text_list, boxes):
+    """Same table as parse_marks, built from rows/columns of the OCR boxes."""
+    return _marks_frame(iter_marks_layout(text_list, boxes))
+
+def iter_marks_layout(text_list, boxes):
+    if not boxes or all(b is None for b in boxes):
+        yield from iter_marks(text_list)
+        return
+    kinds, numbers, names, header_index = classify_tokens(text_list)
+    rows = group_rows(boxes)
+    columns = _column_centres(text_list, boxes, rows)
+
+    # Only rows below the marks table header, when there is one
+    if header_index != -1:
+        header_y = boxes[header_index][3] if boxes[header_index] is not None else -math.inf
+        rows = [row for row in rows if boxes[row[0]][1] >= header_y]
+
+    for row in rows:
+        subject_pos = next((p for p, i in enumerate(row) if kinds[i] in (TOK_SUBJECT, TOK_TOTAL)), None)
+        if subject_pos is None:
+            continue
+        first = row[subject_pos]
+
+        # Subject names OCR'd as several boxes ("PAKISTAN", "STUDIES") are joined
+        parts = [names[first]]
+        nums = []
+        for i in row[subject_pos + 1:]:
+            if numbers[i] == numbers[i]:
+                nums.append(i)
+            elif not nums and kinds[i] == TOK_SUBJECT:
+                parts.append(names[i])
+        if len(nums) < 2:
+            continue
+
+        if kinds[first] == TOK_TOTAL:
+            # Largest two numbers are the total maximum and obtained, as in parse_marks
+            values = sorted((numbers[i] for i in nums), reverse=True)[:2]
+        elif columns is not None:
+            centre = lambda i: (boxes[i][0] + boxes[i][2]) / 2
+            max_i = min(nums, key=lambda i: abs(centre(i) - columns[0]))
+            rest = [i for i in nums if i != max_i]
+            obt_i = min(rest, key=lambda i: abs(centre(i) - columns[1]))
+            values = [numbers[max_i], numbers[obt_i]]
         else:
-            i += 1 # Not a subject candidate, move to next item.
+            values = [numbers[nums[0]], numbers[nums[1]]]
 
-    df = pd.DataFrame({
-        "Subject": subjects,
-        "Maximum": maximum,
-        "Obtained": obtained
-    })
+        yield " ".join(parts), int(values[0]), int(values[1])
 
-    return df
+# ------------------------------------------------------------
+# 3d) Multi-page PDF marksheets
+# ------------------------------------------------------------
+# Text-layer pages skip OCR entirely; scanned pages are rasterized and OCR'd
+# on a thread pool (pdf_ingest.py) and each page is parsed as soon as it is
+# yielded, in page order.
+def _ocr_page(img):
+    img, _ = preprocess(img)
+    cache = get_ocr_cache()
+    key = cache.key(img, CACHE_CONFIG)
+    cached = cache.get(key)
+    if cached is not None and cached["boxes"] is not None:
+        return cached["text"], cached["boxes"]
+    text_data, boxes = _run_ocr(img)
+    cache.put(key, text_data, boxes=boxes)
+    return text_data, boxes
+
+def iter_pdf_marks(pdf_path, verbose=False, layout=False):
+    """Yield (subject, maximum, obtained) rows page by page, as each page is ready."""
+    for page in iter_pdf_pages(pdf_path, ocr=_ocr_page):
+        if verbose:
+            print(f"📄 Page {page.number + 1} ({page.source}):")
+            print(page.text)
+        if layout:
+            yield from iter_marks_layout(page.text, page.boxes)
+        else:
+            yield from iter_marks(page.text)
+
+def extract_marks_from_pdf(pdf_path, verbose=True, layout=False):
+    return _marks_frame(iter_pdf_marks(pdf_path, verbose, layout))
 
 # ------------------------------------------------------------
 # 4) MAIN FUNCTION
 # ------------------------------------------------------------
-def extract_marks_from_marksheet(image_path, output_csv=None):
+def extract_marks_from_marksheet(image_path, output_csv=None, verbose=True, layout=False):
+    if is_pdf(image_path):
+        df = extract_marks_from_pdf(image_path, verbose=verbose, layout=layout)
+        if output_csv:
+            df.to_csv(output_csv, index=False)
+        return df
+
     img, thresh = preprocess_image(image_path)
 
-    print("🔍 Running OCR...")
-    text_list = extract_text(img)
+    cache = get_ocr_cache()
+    key = cache.key(img, LAYOUT_CACHE_CONFIG if layout else CACHE_CONFIG)
+    cached = cache.get(key)
 
-    print("📄 Raw OCR Text:")
-    print(text_list)
+    if cached is not None and (cached["boxes"] is not None or not layout):
+        text_list, boxes = cached["text"], cached["boxes"]
+    else:
+        cached = None
+        if verbose:
+            print("🔍 Running OCR...")
+        text_list, boxes = _run_ocr(img)
 
-    df = parse_marks(text_list)
+    if verbose:
+        print("📄 Raw OCR Text:")
+        print(text_list)
+
+    if cached is not None and cached["marks"] is not None:
+        df = cached["marks"]
+    else:
+        df = parse_marks_layout(text_list, boxes) if layout else parse_marks(text_list)
+        cache.put(key, text_list, df, boxes=boxes)
 
-    print("\n📊 Extracted Marks:")
-    print(df)
+    if verbose:
+        print("\n📊 Extracted Marks:")
+        print(df)
 
     if output_csv:
         df.to_csv(output_csv, index=False)
-        print(f"\n💾 Marks saved to {output_csv}")
+        if verbose:
+            print(f"\n💾 Marks saved to {output_csv}")
 
     return df
 
 
 # ------------------------------------------------------------
-# 5) Run on your marksheet
+# 5) Run on your marksheet (for many marksheets use batch_ocr.py)
 # ------------------------------------------------------------
-extract_marks_from_marksheet("/content/IMG_20210617_120733.jpg", output_csv='marksheet_marks.csv')
\ No newline at end of file
+if __name__ == "__main__":
+    extract_marks_from_marksheet("/content/IMG_20210617_120733.jpg", output_csv='marksheet_marks.csv')
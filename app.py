@@ -1,106 +1,97 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-from supabase import create_client, Client
-from PIL import Image
-from paddleocr import PaddleOCR
 import re
-import io
-
-# Initialize OCR only once
-if "ocr" not in st.session_state:
-    st.session_state.ocr = PaddleOCR(use_angle_cls=True, lang="en")
-
-ocr = st.session_state.ocr
-
-# Example usage:
-# result = ocr.ocr("example.jpg", cls=True)
-# st.write(result)
-
-
-# -------------------- SUPABASE SETUP --------------------
-SUPABASE_URL = "https://jaztokuyzxettemexcrc.supabase.co"
-SUPABASE_KEY = "YOUR_SUPABASE_KEY"
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+import time
+from array import array
+from ocr_pool import get_ocr_pool, OCR_KWARGS
+from ocr_backends import OCR_BACKEND
+from ocr_jobs import get_job_queue, JobQueueFull
+from question_bank import get_riasec_bank, get_tci_bank
+from personality_scoring import (AGREE_SCALE, TRUE_FALSE_SCALE, pack_scores, score_riasec, score_tci,
+                                 unpack_riasec, unpack_tci)
+from session_memo import memoized
+from session_model import get_artifact_store, get_session, reset_session
+# One Supabase client per process (persistence.py) for auth and storage;
+# results and profiles go through the storage repository (storage.py), Supabase
+# unless SKILLBOT_STORAGE=sqlite
+from persistence import get_client
+from rate_limit import client_ip, get_login_guard
+from storage import StorageError, get_repository
+
+# Heavy modules (supabase, plotly, cv2/PyMuPDF via the OCR helpers, the
+# scoring code) are imported inside the functions that use them, so the Home
+# and quiz pages never pay for them. startup_profile.py checks this in CI.
 
 # -------------------- PAGE SETUP --------------------
 st.set_page_config(page_title="SkillBot Career & Personality Profiler", layout="centered")
 
 # -------------------- LOAD DATA --------------------
 try:
-    questions = pd.read_csv("questions.csv")
-    tci_questions = pd.read_csv("tci_questions.csv")
+    questions = get_riasec_bank()
+    tci_questions = get_tci_bank()
 except FileNotFoundError as e:
     st.error(f"Error loading data file: {e}")
     st.stop()
 
 # -------------------- SESSION STATE --------------------
-defaults = {
-    "page": "intro",
-    "index": 0,
-    "answers": [],
-    "tci_page": "intro",
-    "tci_index": 0,
-    "tci_answers": [],
-    "riasec_scores": None,
-    "tci_scores": None,
-    "sidebar_choice": "Home",
-    "user": None,
-    "access_token": None,
-    "marksheet_df": None,
-}
-for k, v in defaults.items():
-    if k not in st.session_state:
-        st.session_state[k] = v
+# One compact SessionModel per session: answers as option codes, scores as
+# float arrays, the marksheet table by reference (see session_model.py)
+session = get_session()
 
 def restart_all():
-    for k, v in defaults.items():
-        st.session_state[k] = v
+    global session
+    session = reset_session()
 
 # -------------------- AUTH --------------------
 def signup_user(email, password):
-    return supabase.auth.sign_up({"email": email, "password": password})
+    return get_client().auth.sign_up({"email": email, "password": password})
 
 def login_user(email, password):
-    return supabase.auth.sign_in_with_password({"email": email, "password": password})
+    # Throttled per client IP and email before anything reaches Supabase
+    # (rate_limit.py); returns None when the attempt is refused or fails
+    guard = get_login_guard()
+    decision = guard.check(client_ip(), email, password)
+    if not decision:
+        st.error(decision.message)
+        return None
+    try:
+        res = get_client().auth.sign_in_with_password({"email": email, "password": password})
+    except Exception as e:
+        # Supabase answers bad credentials with 400; anything else isn't the user's fault
+        if getattr(e, "status", None) in (400, 401):
+            guard.record_failure(email, password)
+            st.error("Invalid email or password.")
+        else:
+            st.error(f"Login failed: {e}")
+        return None
+    guard.record_success(email)
+    return res
 
 def logout_user():
-    st.session_state.user = None
-    st.session_state.access_token = None
-    st.session_state.sidebar_choice = "Home"
+    session.user_id = None
+    session.user_email = None
+    session.access_token = None
+    session.sidebar_choice = "Home"
     st.success("Logged out successfully!")
 
 # -------------------- SAVE RESULTS --------------------
-def save_results_to_supabase(user_id, riasec, tci):
+def show_notice(kind, text):
+    getattr(st, kind)(text)
+
+def save_results_to_supabase(user_id, riasec, tci, notify=show_notice):
     try:
-        riasec_dict = riasec.to_dict()
-        tci_dict = tci.to_dict()
-        supabase.table("test_results").insert({
-            "user_id": user_id,
-            "riasec_R": riasec_dict.get("R"),
-            "riasec_I": riasec_dict.get("I"),
-            "riasec_A": riasec_dict.get("A"),
-            "riasec_S": riasec_dict.get("S"),
-            "riasec_E": riasec_dict.get("E"),
-            "riasec_C": riasec_dict.get("C"),
-            "tci_Persistence": tci_dict.get("Persistence"),
-            "tci_HarmAvoidance": tci_dict.get("Harm Avoidance"),
-            "tci_Cooperativeness": tci_dict.get("Cooperativeness"),
-            "tci_NoveltySeeking": tci_dict.get("NoveltySeeking"),
-            "tci_RewardDependence": tci_dict.get("RewardDependence"),
-            "tci_SelfDirectedness": tci_dict.get("SelfDirectedness"),
-            "tci_SelfTranscendence": tci_dict.get("SelfTranscendence"),
-        }).execute()
-        st.success("✅ Test results saved!")
-    except Exception as e:
-        st.error(f"Could not save results: {e}")
+        get_repository("supabase").save_test_results(user_id, riasec, tci)
+        notify("success", "✅ Test results saved!")
+    except StorageError as e:
+        notify("error", f"Could not save results: {e}")
 
-def upload_marksheet(user_id, file):
+def upload_marksheet(user_id, upload):
     try:
-        file_bytes = file.read()
-        filename = f"{user_id}_{file.name}"
-        supabase.storage.from_("marksheets").upload(filename, file_bytes)
-        public_url = supabase.storage.from_("marksheets").get_public_url(filename)
+        # Same bytes the OCR job decodes from (see ingest.py), no extra read
+        filename = f"{user_id}_{upload.name}"
+        bucket = get_client().storage.from_("marksheets")
+        bucket.upload(filename, upload.data)
+        public_url = bucket.get_public_url(filename)
         st.success("✅ Marksheet uploaded!")
         return public_url
     except Exception as e:
@@ -109,34 +100,26 @@ def upload_marksheet(user_id, file):
 
 def save_profile(user_id, name, gender, age, qualification, marksheet_url):
     try:
-        response = supabase.table("profiles").upsert({
-            "user_id": user_id,
-            "full_name": name,
-            "gender": gender,
-            "age": age,
-            "qualification": qualification,
-            "marksheet_url": marksheet_url
-        }).execute()
-        if response.data is not None:
-            st.success("✅ Profile saved!")
-        else:
-            st.warning("Could not save profile. Check schema/permissions.")
-    except Exception as e:
+        get_repository("supabase").save_profile(user_id, name, gender, age, qualification, marksheet_url)
+        st.success("✅ Profile saved!")
+    except StorageError as e:
         st.error(f"Failed to save profile: {e}")
 
 # -------------------- OCR --------------------
-ocr = PaddleOCR(use_angle_cls=True, lang='en')
-
-def extract_text_from_image(uploaded_file):
-    image = Image.open(uploaded_file).convert("RGB")
-    img_byte_arr = io.BytesIO()
-    image.save(img_byte_arr, format='PNG')
-    result = ocr.ocr(img_byte_arr.getvalue())
-    text_list = []
-    if result and result[0]:
-        for line in result[0]:
-            text_list.append(line[1][0])
-    return text_list
+# Engines are loaded once per process and shared by all sessions (see ocr_pool.py)
+def ocr_image(image):
+    from preprocess import preprocess, record_stage
+    # preprocess.py caps the resolution and only filters when needed
+    image, _ = preprocess(image)
+    with get_ocr_pool().engine() as ocr:
+        start = time.perf_counter()
+        text_list, boxes = ocr.recognize(image)
+        record_stage("ocr", time.perf_counter() - start)
+    return text_list, boxes
+
+def extract_text_from_image(upload):
+    # Decoded straight from the upload buffer into a BGR array (see ingest.py)
+    return ocr_image(upload.decode())[0]
 
 def extract_number_robust(s):
     s = str(s).strip()
@@ -158,58 +141,90 @@ def parse_marks(text_list):
             obtained.append(80)  # demo value, replace with robust logic if needed
     return pd.DataFrame({"Subject": subjects, "Maximum": maximum, "Obtained": obtained})
 
+# -------------------- OCR JOBS --------------------
+OCR_CACHE_CONFIG = {"ocr": OCR_KWARGS, "backend": OCR_BACKEND, "parser": "app.parse_marks"}
+
+# Runs on a worker thread (see ocr_jobs.py), so no st.* calls in here
+def run_marksheet_job(progress, upload):
+    from ocr_cache import get_ocr_cache
+    from pdf_ingest import is_pdf, iter_pdf_pages
+    # Re-uploads of the same file are answered from the OCR cache
+    cache = get_ocr_cache()
+    key = cache.key(upload.buffer, OCR_CACHE_CONFIG)
+    cached = cache.get(key)
+    if cached is not None and cached["marks"] is not None:
+        return cached["marks"]
+    if is_pdf(upload.buffer):
+        # Pages are parsed as they come back; text-layer pages skip OCR
+        text_list, frames = [], []
+        for page in iter_pdf_pages(upload.data, ocr=ocr_image):
+            progress(f"parsing page {page.number + 1}")
+            text_list.extend(page.text)
+            frames.append(parse_marks(page.text))
+        df_marks = pd.concat(frames, ignore_index=True) if frames else parse_marks([])
+    else:
+        progress("reading text")
+        text_list = extract_text_from_image(upload)
+        progress("parsing marks")
+        df_marks = parse_marks(text_list)
+    cache.put(key, text_list, df_marks)
+    return df_marks
+
+@st.fragment(run_every=1.0)
+def marksheet_job_status():
+    job_id = session.ocr_job_id
+    if job_id is None:
+        return
+    job = get_job_queue().get(job_id)
+    if job is None:
+        session.ocr_job_id = None
+        st.error("Marksheet job expired, please submit again.")
+        return
+    if job.pending:
+        st.info(f"⏳ Processing marksheet: {job.stage}...")
+        return
+    session.ocr_job_id = None
+    if job.status == "failed":
+        st.error(f"Could not read marksheet: {job.error}")
+        return
+    session.marksheet_ref = get_artifact_store().put(job.result)
+    if session.riasec_scores is not None and session.tci_scores is not None:
+        # The rerun below would wipe a message shown now; the page shows it next run
+        save_results_to_supabase(session.user_id,
+                                 unpack_riasec(session.riasec_scores),
+                                 unpack_tci(session.tci_scores),
+                                 notify=lambda kind, text: setattr(session, "notice", (kind, text)))
+    st.rerun()
+
 # -------------------- RIASEC / TCI --------------------
 def next_question(selected):
-    st.session_state.answers.append(selected)
-    st.session_state.index += 1
-    if st.session_state.index >= len(questions):
-        st.session_state.page = "riasec_results"
+    session.answers.append(AGREE_SCALE.code(selected))
+    session.index += 1
+    if session.index >= len(questions):
+        session.page = "riasec_results"
     st.rerun()
 
 def next_tci(selected):
-    st.session_state.tci_answers.append(selected)
-    st.session_state.tci_index += 1
-    if st.session_state.tci_index >= len(tci_questions):
-        st.session_state.tci_page = "tci_results"
+    session.tci_answers.append(TRUE_FALSE_SCALE.code(selected))
+    session.tci_index += 1
+    if session.tci_index >= len(tci_questions):
+        session.tci_page = "tci_results"
     st.rerun()
 
-# -------------------- RECOMMENDATION --------------------
-SUBFIELDS = {
-    "Engineering":["Mechanical","Electrical","Civil","Software","Chemical"],
-    "Medical":["MBBS","Pharmacy","Physio","Nursing","Biotech"],
-    "Computer Science":["AI","Data Science","Cyber Security","Software","IT Management"],
-    "Business":["BBA","Marketing","Finance","HR","Supply Chain"],
-    "Arts":["Psychology","Fine Arts","Mass Comm","English","Sociology"],
-    "Commerce":["B.Com","Accounting","Banking","Economics","Business Admin"]
-}
-
-def extract_subject_scores(df):
-    subjects = {"math":["MATH","MATHEMATICS"],"physics":["PHYSICS"],"chemistry":["CHEMISTRY"],
-                "biology":["BIOLOGY"],"computer":["COMPUTER"],"english":["ENGLISH"],
-                "urdu":["URDU"],"islamiat":["ISLAM","ISLAMIYAT"],"pakstudies":["PAKISTAN"]}
-    extracted = {}
-    for key, kws in subjects.items():
-        extracted[key]=0
-        for kw in kws:
-            row = df[df["subject"].str.contains(kw)]
-            if len(row)>0:
-                extracted[key]=int(row.iloc[0]["marks"])
-                break
-    return extracted
+# Results and the figure are memoized per session on the answers (session_memo.py)
+def tci_chart(tci_scores):
+    import plotly.express as px
+    return px.bar(tci_scores,x=tci_scores.index,y=tci_scores.values)
 
-def calculate_best_fit(marks, personality):
-    scores = {"Medical":0,"Engineering":0,"Computer Science":0,"Arts":0,"Business":0,"Commerce":0}
-    scores["Medical"] += (marks.get("biology",0)/150)*0.35 + (marks.get("chemistry",0)/150)*0.35
-    scores["Engineering"] += (marks.get("math",0)/150)*0.35 + (marks.get("physics",0)/150)*0.35
-    scores["Medical"] += personality.get("riasec_I",0)/10*0.3
-    scores["Engineering"] += personality.get("riasec_C",0)/10*0.3
-    total=sum(scores.values())
-    probabilities={k:round(v/total,3) for k,v in scores.items()}
-    return dict(sorted(probabilities.items(), key=lambda x:x[1], reverse=True))
+# -------------------- RECOMMENDATION --------------------
+# Scoring helpers come from LLM.py (weights in field_weights.json, subject index in subjects.py)
 
-def recommend_field(personality_csv, marksheet_csv):
+def recommend_field(personality_csv, marksheet_df):
+    # marksheet_df is this session's OCR table; a shared CSV on disk could be
+    # overwritten by another session's job before we read it back
+    from LLM import SUBFIELDS, calculate_best_fit, clean_marksheet, extract_subject_scores
     p= pd.read_csv(personality_csv)
-    m= pd.read_csv(marksheet_csv)
+    m= clean_marksheet(marksheet_df)
     personality=p.iloc[0].to_dict()
     marks=extract_subject_scores(m)
     field_scores=calculate_best_fit(marks, personality)
@@ -224,79 +239,73 @@ def recommend_field(personality_csv, marksheet_csv):
 # -------------------- SIDEBAR --------------------
 st.sidebar.title("Navigation")
 options = ["Home","RIASEC Test","TCI Test","Dashboard","Sign Up / Login","Profile Creation"]
-choice = st.sidebar.radio("Go to:", options, index=options.index(st.session_state.sidebar_choice))
-st.session_state.sidebar_choice = choice
+choice = st.sidebar.radio("Go to:", options, index=options.index(session.sidebar_choice))
+session.sidebar_choice = choice
 
 # -------------------- PAGES --------------------
 if choice=="Home":
     st.title("🎓 SkillBot Career Profiler")
     st.write("Discover your career & personality path.")
     if st.button("Start RIASEC Test"):
-        st.session_state.page="quiz"
-        st.session_state.sidebar_choice="RIASEC Test"
+        session.page="quiz"
+        session.sidebar_choice="RIASEC Test"
         st.rerun()
 
 elif choice=="RIASEC Test":
-    if st.session_state.page=="intro":
+    if session.page=="intro":
         st.title("🧭 RIASEC Test")
         if st.button("Start Test"):
-            st.session_state.page="quiz"
-            st.session_state.index=0
-            st.session_state.answers=[]
+            session.page="quiz"
+            session.index=0
+            session.answers=array("b")
             st.rerun()
-    elif st.session_state.page=="quiz":
-        q_idx = st.session_state.index
+    elif session.page=="quiz":
+        q_idx = session.index
         if q_idx<len(questions):
-            q=questions.iloc[q_idx]
-            st.markdown(f"### {q['question']}")
+            q=questions.question(q_idx)
+            st.markdown(f"### {q}")
             for i, opt in enumerate(["Strongly Disagree","Disagree","Neutral","Agree","Strongly Agree"]):
                 if st.button(opt, key=f"riasec{q_idx}_{i}"):
                     next_question(opt)
-    elif st.session_state.page=="riasec_results":
-        df=questions.copy()
-        df["answer"]=st.session_state.answers
-        rating_map={"Strongly Disagree":1,"Disagree":2,"Neutral":3,"Agree":4,"Strongly Agree":5}
-        df["score"]=df["answer"].map(rating_map)
-        riasec_scores=df.groupby("category")["score"].mean().sort_values(ascending=False)
-        st.session_state.riasec_scores=riasec_scores
+    elif session.page=="riasec_results":
+        riasec_scores=memoized("riasec_scores",session.answers,score_riasec)
+        session.riasec_scores=pack_scores(riasec_scores,questions)
         st.bar_chart(riasec_scores)
         if st.button("Next: TCI Test"):
-            st.session_state.sidebar_choice="TCI Test"
+            session.sidebar_choice="TCI Test"
             st.rerun()
 
 elif choice=="TCI Test":
-    if st.session_state.tci_page=="intro":
+    if session.tci_page=="intro":
         st.title("🧠 TCI Test")
         if st.button("Start Test"):
-            st.session_state.tci_page="quiz"
-            st.session_state.tci_index=0
-            st.session_state.tci_answers=[]
+            session.tci_page="quiz"
+            session.tci_index=0
+            session.tci_answers=array("b")
             st.rerun()
-    elif st.session_state.tci_page=="quiz":
-        q_idx=st.session_state.tci_index
+    elif session.tci_page=="quiz":
+        q_idx=session.tci_index
         if q_idx<len(tci_questions):
-            q=tci_questions.iloc[q_idx]
-            st.markdown(f"### {q['question']}")
+            q=tci_questions.question(q_idx)
+            st.markdown(f"### {q}")
             col1,col2=st.columns(2)
             if col1.button("True",key=f"t{q_idx}"): next_tci("T")
             if col2.button("False",key=f"f{q_idx}"): next_tci("F")
-    elif st.session_state.tci_page=="tci_results":
-        df=tci_questions.copy()
-        df["answer"]=st.session_state.tci_answers
-        df["score"]=df["answer"].map({"T":1,"F":0})
-        tci_scores=df.groupby("trait")["score"].sum()
-        st.session_state.tci_scores=tci_scores
-        fig=px.bar(tci_scores,x=tci_scores.index,y=tci_scores.values)
+    elif session.tci_page=="tci_results":
+        tci_scores=memoized("tci_scores",session.tci_answers,score_tci)
+        session.tci_scores=pack_scores(tci_scores,tci_questions)
+        fig=memoized("tci_chart",session.tci_answers,lambda _: tci_chart(tci_scores))
         st.plotly_chart(fig)
         if st.button("Go to Dashboard"):
-            st.session_state.sidebar_choice="Dashboard"
+            session.sidebar_choice="Dashboard"
             st.rerun()
 
 elif choice=="Dashboard":
     st.title("📊 Dashboard")
-    r,t=st.session_state.riasec_scores,st.session_state.tci_scores
+    r,t=session.riasec_scores,session.tci_scores
     if r is None or t is None: st.warning("Complete tests first")
     else:
+        r,t=unpack_riasec(r),unpack_tci(t)
         c1,c2=st.columns(2)
         c1.subheader("RIASEC"); c1.bar_chart(r)
         c2.subheader("TCI"); c2.bar_chart(t)
@@ -311,11 +320,12 @@ elif choice=="Sign Up / Login":
         password=st.text_input("Password",type="password",key="login_pass")
         if st.button("Login"): 
             res=login_user(email,password)
-            if res.user:
-                st.session_state.user=res.user
-                st.session_state.access_token=res.session.access_token
+            if res and res.user:
+                session.user_id=res.user.id
+                session.user_email=res.user.email
+                session.access_token=res.session.access_token
                 st.success("Logged in!")
-                st.session_state.sidebar_choice="Profile Creation"
+                session.sidebar_choice="Profile Creation"
                 st.rerun()
     with tab2:
         email=st.text_input("Email",key="signup_email")
@@ -323,15 +333,16 @@ elif choice=="Sign Up / Login":
         if st.button("Sign Up"): 
             res=signup_user(email,password)
             if res.user:
-                st.session_state.user=res.user
-                st.session_state.access_token=res.session.access_token
+                session.user_id=res.user.id
+                session.user_email=res.user.email
+                session.access_token=res.session.access_token
                 st.success("Account created!")
-                st.session_state.sidebar_choice="Profile Creation"
+                session.sidebar_choice="Profile Creation"
                 st.rerun()
 
 elif choice=="Profile Creation":
     st.title("👤 Profile")
-    if st.session_state.user is None: st.warning("Login first")
+    if session.user_id is None: st.warning("Login first")
     else:
         name=st.text_input("Full Name")
         gender=st.selectbox("Gender",["Male","Female","Other"])
@@ -340,14 +351,23 @@ elif choice=="Profile Creation":
         marksheet=st.file_uploader("Upload Marksheet",type=["jpg","jpeg","png","pdf"])
         if st.button("Submit"):
             if all([name,gender,age,qual,marksheet]):
-                marksheet_url=upload_marksheet(st.session_state.user.id,marksheet)
+                from ingest import ingest_upload
+                upload=ingest_upload(marksheet)
+                marksheet_url=upload_marksheet(session.user_id,upload)
                 if marksheet_url:
-                    save_profile(st.session_state.user.id,name,gender,age,qual,marksheet_url)
-                    text_list=extract_text_from_image(marksheet)
-                    df_marks=parse_marks(text_list)
-                    df_marks.to_csv("user_marksheet.csv",index=False)
-                    if st.session_state.riasec_scores is not None and st.session_state.tci_scores is not None:
-                        save_results_to_supabase(st.session_state.user.id,
-                                                 st.session_state.riasec_scores,
-                                                 st.session_state.tci_scores)
-                        recommend_field("response.csv","user_marksheet.csv")
+                    save_profile(session.user_id,name,gender,age,qual,marksheet_url)
+                    try:
+                        session.ocr_job_id=get_job_queue().submit(run_marksheet_job,upload)
+                        session.marksheet_ref=None
+                    except JobQueueFull:
+                        st.error("OCR is busy right now, please try again in a moment.")
+        marksheet_job_status()
+        if session.notice is not None:
+            show_notice(*session.notice)
+            session.notice=None
+        # The table lives in the shared artifact store; if it was evicted, submit again
+        marksheet_df=get_artifact_store().get(session.marksheet_ref) if session.marksheet_ref else None
+        if marksheet_df is not None:
+            st.dataframe(marksheet_df)
+            if session.riasec_scores is not None and session.tci_scores is not None:
+                recommend_field("response.csv",marksheet_df)
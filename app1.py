@@ -1,15 +1,16 @@
 import streamlit as st
-import pandas as pd
 import matplotlib.pyplot as plt
 import auth
-import os
+from question_bank import get_riasec_bank, get_career_bank
+from personality_scoring import LIKE_SCALE, score_riasec
+from response_log import get_response_log
 
 
 # -------------------- PAGE SETUP --------------------
 st.set_page_config(page_title="SkillBot Interest Profiler", layout="centered")
-# -------------------- RESPONSES FILE SETUP --------------------
-RESPONSES_FILE = "responses/responses.xlsx"
-os.makedirs("responses", exist_ok=True)
+# -------------------- RESPONSES LOG --------------------
+# Submissions are appended to responses/log (see response_log.py);
+# `python response_log.py export` writes responses/responses-export.xlsx on demand
 # -------------------- SESSION --------------------
 if "logged_in" not in st.session_state:
     st.session_state.logged_in = False
@@ -82,8 +83,8 @@ elif st.session_state.get("show_login", False):
 
 
 # -------------------- LOAD DATA --------------------
-questions = pd.read_csv("questions.csv")
-careers = pd.read_csv("careers.csv")
+questions = get_riasec_bank()
+careers = get_career_bank()
 
 # -------------------- SESSION STATE --------------------
 if "page" not in st.session_state:
@@ -98,6 +99,7 @@ def restart():
     st.session_state.page = "intro"
     st.session_state.index = 0
     st.session_state.answers = []
+    st.session_state.responses_saved = False
 
 def next_question(selected):
     st.session_state.answers.append(selected)
@@ -105,19 +107,13 @@ def next_question(selected):
     if st.session_state.index >= len(questions):
         st.session_state.page = "results"
 def save_responses():
-    df = questions.copy()
-    df["answer"] = st.session_state.answers
-    df["username"] = st.session_state.get("username")
-    df["email"] = st.session_state.get("email")
-
-    # Save to Excel
-    if os.path.exists(RESPONSES_FILE):
-        existing = pd.read_excel(RESPONSES_FILE)
-        df_to_save = pd.concat([existing, df], ignore_index=True)
-    else:
-        df_to_save = df
-
-    df_to_save.to_excel(RESPONSES_FILE, index=False)
+    # Logged once per completed test, however often the results page reruns
+    if not st.session_state.get("responses_saved"):
+        df = questions.to_frame()
+        df["answer"] = st.session_state.answers
+        get_response_log().append(df, username=st.session_state.get("username"),
+                                  email=st.session_state.get("email"))
+        st.session_state.responses_saved = True
     st.success("Your responses have been saved successfully!")
 
 
@@ -150,10 +146,10 @@ if st.session_state.page == "intro":
 # -------------------- QUIZ PAGE --------------------
 elif st.session_state.page == "quiz":
     q_idx = st.session_state.index
-    q = questions.iloc[q_idx]
+    q = questions.question(q_idx)
 
     st.markdown(f"### Question {q_idx + 1} of {len(questions)}")
-    st.markdown(f"**{q['question']}**")
+    st.markdown(f"**{q}**")
 
     st.write("How much would you enjoy this activity?")
     options = {
@@ -174,18 +170,7 @@ elif st.session_state.page == "results":
     st.title("Your Interest Profile")
 
     # Calculate RIASEC scores
-    df = questions.copy()
-    df["answer"] = st.session_state.answers
-    rating_map = {
-        "Strongly Dislike": 1,
-        "Dislike": 2,
-        "Unsure": 3,
-        "Like": 4,
-        "Strongly Like": 5,
-    }
-    df["score"] = df["answer"].map(rating_map)
-
-    riasec_scores = df.groupby("category")["score"].mean().sort_values(ascending=False)
+    riasec_scores = score_riasec(st.session_state.answers, LIKE_SCALE)
     top = riasec_scores.head(3).index.tolist()
     save_responses()
 
@@ -221,9 +206,9 @@ elif st.session_state.page == "careers":
     else:
         st.write("Based on your top RIASEC interests, here are some careers you might explore:")
         for cat in top_interests:
-            row = careers[careers["category"] == cat]
-            if not row.empty:
-                st.markdown(f"### {cat} — {row.iloc[0]['careers']}")
+            names = careers.careers(cat)
+            if names:
+                st.markdown(f"### {cat} — {', '.join(names)}")
         st.divider()
         st.info("These careers are just starting points — explore more based on your interests and skills!")
 
@@ -1,26 +1,25 @@
 import streamlit as st
-import pandas as pd
-import os
+from rate_limit import CACHED_FAILURE, client_ip, get_login_guard
+from user_store import get_user_store
 
-USER_FILE = "users.csv"
-
-# create user file if it doesn't exist
-if not os.path.exists(USER_FILE):
-    pd.DataFrame(columns=["email", "password"]).to_csv(USER_FILE, index=False)
+# Accounts live in the users table of skillbot.db behind an in-memory index
+# (see user_store.py); the old users.csv is imported on first use.
 
 def signup(email, password):
-    users = pd.read_csv(USER_FILE)
-    if email in users["email"].values:
-        return False
-    pd.DataFrame({"email": [email], "password": [password]}).to_csv(USER_FILE, mode="a", header=False, index=False)
-    return True
+    return get_user_store().create(email, password)
 
 def login(email, password):
-    users = pd.read_csv(USER_FILE)
-    if email in users["email"].values:
-        stored_pw = users.loc[users["email"] == email, "password"].values[0]
-        if stored_pw == password:
-            st.session_state["logged_in"] = True
-            st.session_state["email"] = email
-            return True
-    return False
+    # Throttled per client IP and email before the password is hashed (rate_limit.py)
+    guard = get_login_guard()
+    decision = guard.check(client_ip(), email, password)
+    if not decision:
+        if decision.reason != CACHED_FAILURE:
+            st.warning(decision.message)
+        return False
+    if get_user_store().authenticate(email, password) is None:
+        guard.record_failure(email, password)
+        return False
+    guard.record_success(email)
+    st.session_state["logged_in"] = True
+    st.session_state["email"] = email
+    return True
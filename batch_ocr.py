@@ -0,0 +1,228 @@
+import argparse
+import csv
+import itertools
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+import pandas as pd
+
+# ------------------------------------------------------------
+# Batch marksheet extraction
+# ------------------------------------------------------------
+# Runs OCR.extract_marks_from_marksheet over a directory or manifest of
+# scanned marksheets (images or PDFs) on a process pool (one warm OCR engine
+# per worker) and writes a single consolidated table with an ``id`` column
+# per student.
+#
+#   python batch_ocr.py scans/ -o marksheet_merged.csv --workers 4
+#   python batch_ocr.py manifest.csv -o marksheet_merged.parquet
+#
+# A manifest is a CSV with a ``path`` column and an optional ``student_id``
+# column; without it the file name (minus extension) is used as the id.
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff", ".pdf"}
+
+
+MANIFEST_CHUNK = 10000
+
+
+def collect_inputs(source):
+    """Yield (student_id, image_path) pairs; manifests are read in chunks."""
+    if os.path.isdir(source):
+        for name in sorted(os.listdir(source)):
+            stem, ext = os.path.splitext(name)
+            if ext.lower() in IMAGE_EXTENSIONS:
+                yield stem, os.path.join(source, name)
+        return
+
+    base = os.path.dirname(os.path.abspath(source))
+    for manifest in pd.read_csv(source, chunksize=MANIFEST_CHUNK):
+        if "path" not in manifest.columns:
+            raise ValueError(f"Manifest {source} needs a 'path' column")
+        paths = [p if os.path.isabs(p) else os.path.join(base, p) for p in manifest["path"].astype(str)]
+        if "student_id" in manifest.columns:
+            ids = manifest["student_id"].tolist()
+        else:
+            ids = [os.path.splitext(os.path.basename(p))[0] for p in paths]
+        yield from zip(ids, paths)
+
+
+# ------------------------------------------------------------
+# Worker side
+# ------------------------------------------------------------
+def _init_worker():
+    # Load the models once per worker process, before the first image arrives
+    from ocr_pool import get_ocr_pool
+    get_ocr_pool(size=1)
+
+
+def _process(student_id, path, layout=False):
+    import OCR
+    start = time.perf_counter()
+    try:
+        df = OCR.extract_marks_from_marksheet(path, verbose=False, layout=layout)
+        return student_id, path, df, None, time.perf_counter() - start
+    except Exception as e:
+        return student_id, path, None, f"{type(e).__name__}: {e}", time.perf_counter() - start
+
+
+# ------------------------------------------------------------
+# Driver
+# ------------------------------------------------------------
+# Results are appended to the output as each marksheet finishes and only a
+# bounded window of files is queued on the pool, so memory stays flat however
+# large the archive is and the first rows are on disk within seconds. If a
+# worker process dies (a crash inside the OCR engine, the OOM killer), the
+# files it held count as failed, nothing more is queued on the broken pool,
+# and the rows already written and the summary are kept.
+
+COLUMNS = ["id", "Subject", "Maximum", "Obtained"]
+
+
+class TableWriter:
+    """Appends DataFrame chunks to a .csv or .parquet file as they arrive."""
+
+    def __init__(self, output, columns=COLUMNS):
+        self.output = output
+        self.columns = columns
+        self.rows = 0
+        self._parquet = output.lower().endswith(".parquet")
+        self._writer = None
+
+    def write(self, df):
+        if df.empty:
+            return
+        df = df[self.columns]
+        if self._parquet:
+            import pyarrow as pa           # needs pyarrow
+            import pyarrow.parquet as pq
+            if self._writer is None:
+                table = pa.Table.from_pandas(df, preserve_index=False)
+                self._writer = pq.ParquetWriter(self.output, table.schema)
+            else:
+                table = pa.Table.from_pandas(df, schema=self._writer.schema, preserve_index=False)
+            self._writer.write_table(table)
+        else:
+            header = self._writer is None
+            if header:
+                self._writer = open(self.output, "w", newline="", encoding="utf-8")
+            df.to_csv(self._writer, header=header, index=False)
+            self._writer.flush()
+        self.rows += len(df)
+
+    def close(self):
+        if self._writer is None:
+            # Nothing extracted: still leave a table with the expected columns
+            empty = pd.DataFrame(columns=self.columns)
+            if self._parquet:
+                empty.to_parquet(self.output, index=False)
+            else:
+                empty.to_csv(self.output, index=False)
+        else:
+            self._writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _report_writer(report):
+    if not report:
+        return None
+    f = open(report, "w", newline="", encoding="utf-8")
+    writer = csv.DictWriter(f, fieldnames=["id", "path", "seconds", "rows", "error"])
+    writer.writeheader()
+    return f, writer
+
+
+def run_batch(items, output, workers=None, report=None, layout=False):
+    workers = workers or os.cpu_count() or 1
+    items = iter(items)
+    done = failures = skipped = 0
+    broken = False
+    start = time.perf_counter()
+    report_out = _report_writer(report)
+
+    ctx = multiprocessing.get_context("spawn")
+    with TableWriter(output) as table, \
+            ProcessPoolExecutor(max_workers=workers, mp_context=ctx, initializer=_init_worker) as pool:
+        running = {}  # future -> (student_id, path, submitted at)
+
+        def submit(n):
+            nonlocal broken, skipped
+            for student_id, path in itertools.islice(items, n):
+                try:
+                    future = pool.submit(_process, student_id, path, layout)
+                except BrokenProcessPool:
+                    broken, skipped = True, skipped + 1
+                    return
+                running[future] = (student_id, path, time.perf_counter())
+
+        # Keep every worker busy with one file queued behind it, no more
+        submit(2 * workers)
+        while running:
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                student_id, path, submitted = running.pop(future)
+                try:
+                    _, _, df, error, seconds = future.result()
+                except Exception as e:
+                    # The worker died or its result could not be sent back
+                    df, error, seconds = None, f"{type(e).__name__}: {e}", time.perf_counter() - submitted
+                    broken = broken or isinstance(e, BrokenProcessPool)
+                done += 1
+                if report_out:
+                    report_out[1].writerow({"id": student_id, "path": path, "seconds": round(seconds, 3),
+                                            "rows": 0 if df is None else len(df), "error": error})
+                    report_out[0].flush()
+                if error:
+                    failures += 1
+                    print(f"[{done}] FAILED {path} ({seconds:.2f}s): {error}", file=sys.stderr)
+                else:
+                    df.insert(0, "id", student_id)
+                    table.write(df)
+                    print(f"[{done}] {path}: {len(df)} rows in {seconds:.2f}s")
+                if not broken:
+                    submit(1)
+        if broken:
+            skipped += sum(1 for _ in items)
+
+    if report_out:
+        report_out[0].close()
+    elapsed = time.perf_counter() - start
+    print(f"\n💾 {table.rows} rows from {done - failures} marksheets saved to {output}")
+    print(f"⏱  {done} images in {elapsed:.1f}s "
+          f"({done / elapsed if elapsed else 0:.2f} images/s, {workers} workers)")
+    if failures:
+        print(f"⚠️ {failures} marksheets failed", file=sys.stderr)
+    if broken:
+        print(f"⚠️ A worker process died; stopped with {skipped} marksheets not processed", file=sys.stderr)
+    return {"files": done, "failures": failures, "skipped": skipped, "rows": table.rows, "seconds": elapsed}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Extract marks from many marksheet images.")
+    parser.add_argument("source", help="directory of images or manifest CSV")
+    parser.add_argument("-o", "--output", default="marksheet_merged.csv", help=".csv or .parquet output")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--report", help="optional CSV with per-file timing and errors")
+    parser.add_argument("--layout", action="store_true", help="parse tables from OCR box positions")
+    args = parser.parse_args(argv)
+
+    items = collect_inputs(args.source)
+    first = next(items, None)
+    if first is None:
+        parser.error(f"no images found in {args.source}")
+    items = itertools.chain([first], items)
+    summary = run_batch(items, args.output, workers=args.workers, report=args.report, layout=args.layout)
+    return 1 if summary["failures"] or summary["skipped"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
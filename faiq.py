@@ -1,18 +1,20 @@
 import streamlit as st
-import pandas as pd
 import plotly.express as px
-import json
 import os
 from datetime import datetime
+from question_bank import get_riasec_bank, get_career_bank, get_tci_bank
+from personality_scoring import score_riasec, score_tci
+from storage import StorageError, get_repository
+from user_store import get_user_store
 
 # -------------------- PAGE SETUP --------------------
 st.set_page_config(page_title="SkillBot Career & Personality Profiler", layout="centered")
 
 # -------------------- LOAD DATA --------------------
 try:
-    questions = pd.read_csv("questions.csv")
-    careers = pd.read_csv("careers.csv")
-    tci_questions = pd.read_csv("tci_questions.csv")
+    questions = get_riasec_bank()
+    careers = get_career_bank()
+    tci_questions = get_tci_bank()
 except FileNotFoundError as e:
     st.error(f"Error loading data file: {e}. Make sure 'questions.csv', 'careers.csv', and 'tci_questions.csv' are in the correct directory.")
     st.stop()
@@ -30,6 +32,7 @@ defaults = {
     "sidebar_choice": "Home",
     "user_authenticated": False,
     "user_data": None,
+    "username": None,
 }
 for key, val in defaults.items():
     if key not in st.session_state:
@@ -108,9 +111,9 @@ elif choice == "RIASEC Test":
     elif st.session_state.page == "quiz":
         if st.session_state.index < len(questions):
             q_idx = st.session_state.index
-            q = questions.iloc[q_idx]
+            q = questions.question(q_idx)
             st.markdown(f"### Question {q_idx + 1} of {len(questions)}")
-            st.markdown(f"**{q['question']}**")
+            st.markdown(f"**{q}**")
             options = {
                 "Strongly Disagree": "😠",
                 "Disagree": "🙁",
@@ -124,11 +127,7 @@ elif choice == "RIASEC Test":
                     next_question(label)
     elif st.session_state.page == "riasec_results":
         st.title("Your RIASEC Profile")
-        df = questions.copy()
-        df["answer"] = st.session_state.answers
-        rating_map = {"Strongly Disagree": 1, "Disagree": 2, "Neutral": 3, "Agree": 4, "Strongly Agree": 5}
-        df["score"] = df["answer"].map(rating_map)
-        riasec_scores = df.groupby("category")["score"].mean().sort_values(ascending=False)
+        riasec_scores = score_riasec(st.session_state.answers)
         st.session_state.riasec_scores = riasec_scores
         st.bar_chart(riasec_scores)
         top = riasec_scores.head(3).index.tolist()
@@ -153,9 +152,9 @@ elif choice == "TCI Test":
     elif st.session_state.tci_page == "quiz":
         if st.session_state.tci_index < len(tci_questions):
             q_idx = st.session_state.tci_index
-            q = tci_questions.iloc[q_idx]
+            q = tci_questions.question(q_idx)
             st.markdown(f"### Question {q_idx + 1} of {len(tci_questions)}")
-            st.markdown(f"**{q['question']}**")
+            st.markdown(f"**{q}**")
             cols = st.columns(2)
             if cols[0].button("✅ True", key=f"tci_q{q_idx}_true"):
                 next_tci("T")
@@ -163,10 +162,7 @@ elif choice == "TCI Test":
                 next_tci("F")
     elif st.session_state.tci_page == "tci_results":
         st.title("Your TCI Personality Profile")
-        df = tci_questions.copy()
-        df["answer"] = st.session_state.tci_answers
-        df["score"] = df["answer"].map({"T": 1, "F": 0})
-        tci_scores = df.groupby("trait")["score"].sum()
+        tci_scores = score_tci(st.session_state.tci_answers)
         st.session_state.tci_scores = tci_scores
 
         fig = px.bar(tci_scores, x=tci_scores.index, y=tci_scores.values,
@@ -225,13 +221,13 @@ elif choice == "Sign Up":
             st.error("Please fill all fields.")
         elif password != confirm:
             st.error("Passwords do not match.")
+        # Hashed into skillbot.db's users table (see user_store.py), keyed by username
+        elif not get_user_store().create(username, password):
+            st.error("That username is already taken.")
         else:
-            os.makedirs("users", exist_ok=True)
-            data = {"username": username, "password": password}
-            with open(f"users/{username}.json", "w") as f:
-                json.dump(data, f)
             st.success("Account created successfully!")
             st.session_state.user_authenticated = True
+            st.session_state.username = username
             st.session_state.sidebar_choice = "Profile Creation (Hidden)"
             st.rerun()
 
@@ -264,7 +260,15 @@ elif choice == "Profile Creation (Hidden)":
                 "qualification": qualification,
                 "marksheet_file": file_path
             }
-            with open(f"profiles/{name}_profile.json", "w") as f:
-                json.dump(profile, f)
-            st.success("Profile created successfully!")
-            st.json(profile)
+            # Saved locally in skillbot.db unless SKILLBOT_STORAGE says otherwise
+            user_id = st.session_state.username or name
+            try:
+                repo = get_repository("sqlite")
+                repo.save_profile(user_id, name, gender, age, qualification, file_path)
+                if st.session_state.riasec_scores is not None and st.session_state.tci_scores is not None:
+                    repo.save_test_results(user_id, st.session_state.riasec_scores, st.session_state.tci_scores)
+            except StorageError as e:
+                st.error(f"Could not save profile: {e}")
+            else:
+                st.success("Profile created successfully!")
+                st.json(profile)
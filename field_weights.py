@@ -0,0 +1,67 @@
+import json
+import os
+import threading
+
+# ------------------------------------------------------------
+# Field recommender weights
+# ------------------------------------------------------------
+# field_weights.json lists, per field, how much each subject mark and each
+# personality trait counts, plus the field's subfields. It is compiled once
+# per process into per-field term lists used by LLM.py:
+#
+#   score = sum(marks[subject] / mark_scale * weight)             file order
+#         + sum(traits with equal weight) / trait_scale * weight
+#
+# LLM.score_cohort evaluates the terms column by column in that order, so a
+# cohort gets bit-for-bit the scores the original per-student formula gave.
+# Point SKILLBOT_FIELD_WEIGHTS at another file to change weights without a
+# code change.
+
+WEIGHTS_FILE = os.environ.get(
+    "SKILLBOT_FIELD_WEIGHTS",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "field_weights.json"),
+)
+
+
+class FieldWeights:
+    def __init__(self, config):
+        self.subject_keys = list(config["subjects"])
+        self.trait_keys = list(config["traits"])
+        self.fields = list(config["fields"])
+        self.subfields = {f: list(spec.get("subfields", [])) for f, spec in config["fields"].items()}
+
+        self.mark_scale = config.get("mark_scale", 1)
+        self.trait_scale = config.get("trait_scale", 1)
+
+        # Per field: [(subject column, weight)] in file order, and the traits
+        # grouped by weight as [(weight, [trait columns])], which is how the
+        # original formula wrote them: ((riasec_I + riasec_A) / 10) * 0.3
+        self.mark_terms = []
+        self.trait_terms = []
+        for spec in config["fields"].values():
+            self.mark_terms.append([(_column(self.subject_keys, key, "subject"), weight)
+                                    for key, weight in spec.get("marks", {}).items()])
+            groups = {}
+            for key, weight in spec.get("traits", {}).items():
+                groups.setdefault(weight, []).append(_column(self.trait_keys, key, "trait"))
+            self.trait_terms.append(list(groups.items()))
+
+
+def _column(keys, key, kind):
+    if key not in keys:
+        raise ValueError(f"Unknown {kind} '{key}' in {WEIGHTS_FILE}")
+    return keys.index(key)
+
+
+_compiled = {}
+_lock = threading.Lock()
+
+
+def load_weights(path=WEIGHTS_FILE):
+    """Return the compiled FieldWeights for path, parsing the file only once."""
+    if path not in _compiled:
+        with _lock:
+            if path not in _compiled:
+                with open(path, encoding="utf-8") as f:
+                    _compiled[path] = FieldWeights(json.load(f))
+    return _compiled[path]
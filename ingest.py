@@ -0,0 +1,61 @@
+import io
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from preprocess import MAX_SIDE
+
+# ------------------------------------------------------------
+# Upload ingest
+# ------------------------------------------------------------
+# A marksheet upload is read exactly once. The same immutable bytes go to
+# storage, and OCR decodes from a memoryview over them straight into a BGR
+# array, with no PIL RGB copy or PNG re-encode in between.
+
+# cv2 can decode JPEGs at 1/2, 1/4 or 1/8 scale without building the full image
+_REDUCED_FLAGS = ((8, cv2.IMREAD_REDUCED_COLOR_8), (4, cv2.IMREAD_REDUCED_COLOR_4),
+                  (2, cv2.IMREAD_REDUCED_COLOR_2))
+
+
+class Upload:
+    __slots__ = ("name", "data", "buffer")
+
+    def __init__(self, name, data):
+        self.name = name
+        self.data = data                  # bytes, shared by storage and OCR
+        self.buffer = memoryview(data)    # zero-copy view for decoders and hashing
+
+    def __len__(self):
+        return len(self.data)
+
+    def image_size(self):
+        # PIL only parses the header here, the pixels are not decoded
+        with Image.open(io.BytesIO(self.data)) as im:
+            return im.size
+
+    def decode(self, max_side=MAX_SIDE):
+        """Decode to a BGR uint8 array, using reduced-size decoding when the image is much larger than max_side."""
+        flag = cv2.IMREAD_COLOR
+        if max_side:
+            try:
+                longest = max(self.image_size())
+            except Exception:
+                longest = 0
+            for factor, reduced in _REDUCED_FLAGS:
+                if longest // factor >= max_side:
+                    flag = reduced
+                    break
+        img = cv2.imdecode(np.frombuffer(self.buffer, dtype=np.uint8), flag)
+        if img is None:
+            raise ValueError(f"Could not decode image: {self.name}")
+        return img
+
+
+def ingest_upload(uploaded_file):
+    """Read a Streamlit UploadedFile (or any binary file object) once into an Upload."""
+    if hasattr(uploaded_file, "getvalue"):
+        data = uploaded_file.getvalue()   # does not move the stream position
+    else:
+        data = uploaded_file.read()
+    return Upload(getattr(uploaded_file, "name", "upload"), data)
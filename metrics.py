@@ -0,0 +1,70 @@
+import threading
+from collections import defaultdict
+
+# ------------------------------------------------------------
+# Process-wide counters
+# ------------------------------------------------------------
+# Cheap named counters shared by every session in the process. Caches report
+# hits and misses here; snapshot() adds a hit rate per cache. observe() keeps
+# a running summary (count, total, min, max) of a measured value, such as
+# the bytes each session holds.
+
+_lock = threading.Lock()
+_counters = defaultdict(int)
+_summaries = {}  # name -> [count, total, min, max]
+
+
+def incr(name, n=1):
+    with _lock:
+        _counters[name] += n
+
+
+def observe(name, value):
+    with _lock:
+        summary = _summaries.get(name)
+        if summary is None:
+            _summaries[name] = [1, value, value, value]
+        else:
+            summary[0] += 1
+            summary[1] += value
+            summary[2] = min(summary[2], value)
+            summary[3] = max(summary[3], value)
+
+
+def summaries():
+    """{name: {"count", "mean", "min", "max"}} for every observed value."""
+    with _lock:
+        items = [(name, list(summary)) for name, summary in _summaries.items()]
+    return {name: {"count": count, "mean": total / count, "min": low, "max": high}
+            for name, (count, total, low, high) in items}
+
+
+def record_cache(cache, hit):
+    incr(f"{cache}.hits" if hit else f"{cache}.misses")
+
+
+def cache_stats():
+    """{cache: {"hits", "misses", "hit_rate"}} for every cache that reported."""
+    with _lock:
+        counters = dict(_counters)
+    stats = {}
+    for name, value in counters.items():
+        cache, _, kind = name.rpartition(".")
+        if kind in ("hits", "misses"):
+            stats.setdefault(cache, {"hits": 0, "misses": 0})[kind] = value
+    for entry in stats.values():
+        lookups = entry["hits"] + entry["misses"]
+        entry["hit_rate"] = entry["hits"] / lookups if lookups else 0.0
+    return stats
+
+
+def snapshot():
+    with _lock:
+        counters = dict(_counters)
+    return {"counters": counters, "caches": cache_stats(), "summaries": summaries()}
+
+
+def reset():
+    with _lock:
+        _counters.clear()
+        _summaries.clear()
@@ -0,0 +1,223 @@
+import argparse
+import hashlib
+import json
+import os
+import sys
+import threading
+
+import numpy as np
+
+# ------------------------------------------------------------
+# Pluggable OCR backends
+# ------------------------------------------------------------
+# Every backend turns a BGR image into the same thing the parsers consume:
+#   recognize(img) -> (text_list, boxes), boxes[i] = [x0, y0, x1, y1, confidence] or None
+# SKILLBOT_OCR_BACKEND picks one per deployment:
+#   paddle     PaddleOCR (default, most accurate, heavy to import and load)
+#   tesseract  Tesseract via pytesseract, light on CPU-only nodes
+#   fake       replays recorded token lists, no model at all (tests/benchmarks)
+#
+# Record tokens from a real backend once, then replay them anywhere:
+#   python ocr_backends.py record scans/*.jpg -o tokens.json
+#   SKILLBOT_OCR_BACKEND=fake SKILLBOT_OCR_FAKE_TOKENS=tokens.json python batch_ocr.py scans/
+
+OCR_BACKEND = os.environ.get("SKILLBOT_OCR_BACKEND", "paddle")
+FAKE_TOKENS = os.environ.get("SKILLBOT_OCR_FAKE_TOKENS", "ocr_tokens.json")
+
+
+class OCRBackend:
+    name = None
+
+    def recognize(self, img):
+        raise NotImplementedError
+
+
+def _bbox(points):
+    # Paddle gives either [x0, y0, x1, y1] or a polygon of (x, y) points
+    pts = np.asarray(points, dtype=float).reshape(-1)
+    if pts.size == 4:
+        return [float(v) for v in pts]
+    xs, ys = pts[0::2], pts[1::2]
+    return [float(xs.min()), float(ys.min()), float(xs.max()), float(ys.max())]
+
+
+def parse_paddle_result(result):
+    """Normalize any PaddleOCR result format to (text_data, boxes)."""
+    text_data = []
+    boxes = []
+    if result and result[0]: # Check if result is not empty and has detections for the first image
+        # PaddleOCR can return a list of dictionaries with results per image, or a list of detection tuples.
+        # The 'Warning: Unrecognized item format' suggests result[0] is a dictionary.
+        if isinstance(result[0], dict) and 'rec_texts' in result[0]:
+            # If result[0] is a dictionary and contains 'rec_texts' (a list of text strings)
+            page = result[0]
+            text_data = list(page['rec_texts'])
+            scores = page.get('rec_scores')
+            scores = list(scores) if scores is not None else [None] * len(text_data)
+            coords = page.get('rec_boxes')
+            if coords is None:
+                coords = page.get('rec_polys')
+            if coords is not None and len(coords) == len(text_data):
+                boxes = [_bbox(c) + [None if s is None else float(s)] for c, s in zip(coords, scores)]
+            else:
+                boxes = [None] * len(text_data)
+        elif isinstance(result[0], list):
+            # Fallback for older PaddleOCR versions or different output formats
+            # where result[0] is directly a list of detection items
+            for item in result[0]:
+                # Handle potential variations in PaddleOCR output format
+                if isinstance(item, (list, tuple)) and len(item) == 3: # Format: (bbox, text_str, confidence_float)
+                    box_coords, text_str, confidence = item
+                    text_data.append(text_str)
+                    boxes.append(_bbox(box_coords) + [float(confidence)])
+                elif isinstance(item, (list, tuple)) and len(item) == 2: # Format: (bbox, (text_str, confidence_float))
+                    box_coords, text_info = item
+                    if isinstance(text_info, (list, tuple)) and len(text_info) == 2:
+                        text_data.append(text_info[0])
+                        boxes.append(_bbox(box_coords) + [float(text_info[1])])
+                    else:
+                        # Fallback if text_info is not a (text, confidence) tuple
+                        text_data.append(str(text_info))
+                        boxes.append(_bbox(box_coords) + [None])
+                else:
+                    print(f"Warning: Unrecognized item format from PaddleOCR: {item}")
+        else:
+            print(f"Warning: Unrecognized top-level item format from PaddleOCR: {result[0]}")
+    return text_data, boxes
+
+
+class PaddleBackend(OCRBackend):
+    name = "paddle"
+
+    def __init__(self, **ocr_kwargs):
+        from paddleocr import PaddleOCR
+        self.engine = PaddleOCR(**ocr_kwargs)
+
+    def recognize(self, img):
+        return parse_paddle_result(self.engine.ocr(img))
+
+
+class TesseractBackend(OCRBackend):
+    name = "tesseract"
+    # Tesseract language codes for the PaddleOCR ones used in OCR_KWARGS
+    LANGS = {"en": "eng", "ch": "chi_sim", "ur": "urd"}
+    # Words further apart than this many word heights are separate cells
+    GAP_FACTOR = 1.0
+
+    def __init__(self, lang="en", psm=11, **_):
+        import pytesseract
+        self._tesseract = pytesseract
+        self.lang = self.LANGS.get(lang, lang)
+        self.config = f"--psm {psm}"  # 11: sparse text, finds table cells on their own
+
+    def recognize(self, img):
+        data = self._tesseract.image_to_data(img[:, :, ::-1] if img.ndim == 3 else img, lang=self.lang,
+                                             config=self.config, output_type=self._tesseract.Output.DICT)
+        text_data, boxes = [], []
+        last_line, last_x1 = None, None
+        for i, word in enumerate(data["text"]):
+            conf = float(data["conf"][i])
+            word = word.strip()
+            if not word or conf < 0:
+                continue
+            x0, y0 = data["left"][i], data["top"][i]
+            x1, y1 = x0 + data["width"][i], y0 + data["height"][i]
+            line = (data["block_num"][i], data["par_num"][i], data["line_num"][i])
+            if line == last_line and x0 - last_x1 <= self.GAP_FACTOR * (y1 - y0):
+                # Same cell: extend the token, keep the lowest word confidence
+                text_data[-1] += " " + word
+                box = boxes[-1]
+                box[1], box[2], box[3] = min(box[1], y0), max(box[2], x1), max(box[3], y1)
+                box[4] = min(box[4], conf / 100)
+            else:
+                text_data.append(word)
+                boxes.append([float(x0), float(y0), float(x1), float(y1), conf / 100])
+            last_line, last_x1 = line, x1
+        return text_data, boxes
+
+
+class FakeBackend(OCRBackend):
+    """
+    Replays recorded pages from a JSON list of {"sha256", "text", "boxes"}.
+    An image that was recorded gets its own tokens back; any other image gets
+    the next recording in turn, so runs are deterministic either way.
+    """
+    name = "fake"
+
+    def __init__(self, tokens=FAKE_TOKENS, pages=None, **_):
+        if pages is None:
+            with open(tokens, encoding="utf-8") as f:
+                pages = json.load(f)
+        if not pages:
+            raise ValueError("FakeBackend needs at least one recorded page")
+        self.pages = pages
+        self._by_hash = {p["sha256"]: p for p in pages if p.get("sha256")}
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def recognize(self, img):
+        page = self._by_hash.get(image_hash(img))
+        if page is None:
+            with self._lock:
+                page = self.pages[self._next % len(self.pages)]
+                self._next += 1
+        boxes = page.get("boxes") or [None] * len(page["text"])
+        return list(page["text"]), [None if b is None else list(b) for b in boxes]
+
+
+BACKENDS = {b.name: b for b in (PaddleBackend, TesseractBackend, FakeBackend)}
+
+
+def create_backend(name=OCR_BACKEND, **ocr_kwargs):
+    try:
+        backend = BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown OCR backend {name!r}; choose one of {sorted(BACKENDS)}") from None
+    return backend(**ocr_kwargs)
+
+
+def image_hash(img):
+    return hashlib.sha256(np.ascontiguousarray(img).data).hexdigest()
+
+
+# ------------------------------------------------------------
+# Recording tokens for the fake backend
+# ------------------------------------------------------------
+def record(paths, output, backend=None):
+    """OCR each image with a real backend (after preprocessing) and save the tokens."""
+    import cv2
+    from ocr_pool import OCR_KWARGS
+    from preprocess import preprocess
+
+    backend = backend or create_backend("paddle", **OCR_KWARGS)
+    pages = []
+    for path in paths:
+        img = cv2.imread(path)
+        if img is None:
+            print(f"Skipping unreadable image: {path}", file=sys.stderr)
+            continue
+        img, _ = preprocess(img)
+        text_data, boxes = backend.recognize(img)
+        pages.append({"source": path, "sha256": image_hash(img), "text": text_data, "boxes": boxes})
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(pages, f, ensure_ascii=False)
+    print(f"💾 {len(pages)} pages of OCR tokens saved to {output}")
+    return pages
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Record OCR tokens for the fake backend.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    rec = sub.add_parser("record", help="OCR images and save their tokens as JSON")
+    rec.add_argument("images", nargs="+")
+    rec.add_argument("-o", "--output", default=FAKE_TOKENS)
+    rec.add_argument("--backend", default="paddle", choices=sorted(set(BACKENDS) - {"fake"}))
+    args = parser.parse_args(argv)
+
+    from ocr_pool import OCR_KWARGS
+    record(args.images, args.output, create_backend(args.backend, **OCR_KWARGS))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,138 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+import pandas as pd
+
+# ------------------------------------------------------------
+# On-disk cache of OCR results keyed by image content
+# ------------------------------------------------------------
+# Re-uploads of the same marksheet hash to the same key, so the text list
+# (with OCR boxes when available) and parsed marks come back from disk
+# instead of another OCR pass. Entries are JSON files; the least recently
+# used ones are evicted once the cache grows past max_bytes.
+
+CACHE_DIR = os.environ.get("SKILLBOT_OCR_CACHE_DIR", ".ocr_cache")
+CACHE_MAX_BYTES = int(os.environ.get("SKILLBOT_OCR_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+# Bump when OCR or parsing changes so stale results are not served
+CACHE_VERSION = 3
+
+
+class OCRCache:
+    def __init__(self, directory=CACHE_DIR, max_bytes=CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+        # key -> [size, last_used]; rebuilt from the files left by earlier runs
+        self._index = {}
+        for name in os.listdir(directory):
+            if name.endswith(".json"):
+                st = os.stat(os.path.join(directory, name))
+                self._index[name[:-5]] = [st.st_size, st.st_mtime]
+        self._bytes = sum(size for size, _ in self._index.values())
+
+    @staticmethod
+    def key(image, config=None):
+        """Hash image bytes (or a decoded array) together with the OCR config."""
+        h = hashlib.sha256()
+        h.update(json.dumps({"v": CACHE_VERSION, "config": config}, sort_keys=True, default=str).encode())
+        if hasattr(image, "shape") and hasattr(image, "dtype"):
+            # Decoded arrays: hash pixels plus geometry, independent of memory layout
+            h.update(f"{image.shape}{image.dtype}".encode())
+            h.update(image.tobytes())
+        else:
+            h.update(memoryview(image))
+        return h.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + ".json")
+
+    def get(self, key):
+        """Return {"text": [...], "marks": DataFrame or None, "boxes": [...] or None}, or None on a miss."""
+        path = self._path(key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                entry = json.load(f)
+            os.utime(path)  # mark as recently used
+            st = os.stat(path)
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+            old = self._index.get(key)
+            self._bytes += st.st_size - (old[0] if old else 0)
+            self._index[key] = [st.st_size, st.st_mtime]
+        marks = entry.get("marks")
+        if marks is not None:
+            marks = pd.DataFrame(marks["data"], columns=marks["columns"])
+        return {"text": entry["text"], "marks": marks, "boxes": entry.get("boxes")}
+
+    def put(self, key, text_list, marks=None, boxes=None):
+        entry = {
+            "text": list(text_list),
+            "marks": None if marks is None else marks.to_dict(orient="split", index=False),
+            "boxes": boxes,
+        }
+        data = json.dumps(entry, default=str).encode("utf-8")
+        # Write to a temp file and rename so readers never see a partial entry
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, self._path(key))
+        with self._lock:
+            old = self._index.get(key)
+            if old:
+                self._bytes -= old[0]
+            self._index[key] = [len(data), os.path.getmtime(self._path(key))]
+            self._bytes += len(data)
+            self._evict()
+
+    def _evict(self):
+        if self._bytes <= self.max_bytes:
+            return
+        for key, (size, _) in sorted(self._index.items(), key=lambda kv: kv[1][1]):
+            if self._bytes <= self.max_bytes:
+                break
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+            del self._index[key]
+            self._bytes -= size
+            self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._index),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_ocr_cache():
+    """Return the process-wide OCR cache."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = OCRCache()
+    return _cache
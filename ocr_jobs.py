@@ -0,0 +1,116 @@
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from ocr_pool import POOL_SIZE
+
+# ------------------------------------------------------------
+# Background OCR jobs
+# ------------------------------------------------------------
+# The Streamlit script thread only enqueues work and polls for it, so reruns
+# stay fast while OCR runs on a fixed number of worker threads per node.
+
+MAX_WORKERS = int(os.environ.get("SKILLBOT_OCR_WORKERS", str(POOL_SIZE)))
+MAX_PENDING = int(os.environ.get("SKILLBOT_OCR_MAX_PENDING", "100"))
+KEEP_FINISHED = int(os.environ.get("SKILLBOT_OCR_KEEP_FINISHED", "1000"))
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+
+class JobQueueFull(RuntimeError):
+    """Raised when too many OCR jobs are already waiting on this node."""
+
+
+class OCRJob:
+    __slots__ = ("id", "status", "stage", "result", "error",
+                 "submitted_at", "started_at", "finished_at")
+
+    def __init__(self, job_id):
+        self.id = job_id
+        self.status = QUEUED
+        self.stage = "waiting for a free worker"
+        self.result = None
+        self.error = None
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    @property
+    def pending(self):
+        return self.status in (QUEUED, RUNNING)
+
+
+class OCRJobQueue:
+    def __init__(self, max_workers=MAX_WORKERS, max_pending=MAX_PENDING, keep_finished=KEEP_FINISHED):
+        self.max_pending = max_pending
+        self.keep_finished = keep_finished
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ocr-job")
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, func, *args, **kwargs):
+        """Queue ``func(progress, *args, **kwargs)`` and return its job id.
+
+        ``progress`` is a callable the job uses to report its current stage.
+        """
+        with self._lock:
+            pending = sum(1 for job in self._jobs.values() if job.pending)
+            if pending >= self.max_pending:
+                raise JobQueueFull(f"{pending} OCR jobs already pending")
+            job = OCRJob(uuid.uuid4().hex)
+            self._jobs[job.id] = job
+            self._trim()
+        self._executor.submit(self._run, job, func, args, kwargs)
+        return job.id
+
+    def _run(self, job, func, args, kwargs):
+        job.status = RUNNING
+        job.started_at = time.time()
+
+        def progress(stage):
+            job.stage = stage
+
+        try:
+            job.result = func(progress, *args, **kwargs)
+            job.status = DONE
+            job.stage = "finished"
+        except Exception as e:
+            job.error = f"{type(e).__name__}: {e}"
+            job.status = FAILED
+            job.stage = "failed"
+        finally:
+            job.finished_at = time.time()
+
+    def _trim(self):
+        # Forget the oldest finished jobs once we hold more than keep_finished
+        finished = [job_id for job_id, job in self._jobs.items() if not job.pending]
+        for job_id in finished[:max(0, len(finished) - self.keep_finished)]:
+            del self._jobs[job_id]
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def stats(self):
+        with self._lock:
+            counts = {QUEUED: 0, RUNNING: 0, DONE: 0, FAILED: 0}
+            for job in self._jobs.values():
+                counts[job.status] += 1
+        return counts
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_job_queue():
+    """Return the process-wide job queue, creating it on first use."""
+    global _queue
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                _queue = OCRJobQueue()
+    return _queue
@@ -0,0 +1,113 @@
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+# ------------------------------------------------------------
+# Process-wide pool of warm OCR engines
+# ------------------------------------------------------------
+# Streamlit re-executes app.py on every rerun, but imported modules stay in
+# sys.modules, so a pool kept here is built once per process and shared by
+# every session. Engines are OCR backends (ocr_backends.py), picked with
+# SKILLBOT_OCR_BACKEND.
+
+POOL_SIZE = int(os.environ.get("SKILLBOT_OCR_POOL_SIZE", "1"))
+CHECKOUT_TIMEOUT = float(os.environ.get("SKILLBOT_OCR_CHECKOUT_TIMEOUT", "30"))
+OCR_KWARGS = {"use_angle_cls": True, "lang": "en"}
+
+
+class OCRPoolTimeout(RuntimeError):
+    """Raised when no OCR engine becomes free within the checkout timeout."""
+
+
+def _backend_factory(**kwargs):
+    from ocr_backends import create_backend
+    return create_backend(**kwargs)
+
+
+class OCREnginePool:
+    def __init__(self, size=POOL_SIZE, factory=None, **ocr_kwargs):
+        if size < 1:
+            raise ValueError("OCR pool size must be at least 1")
+        self.size = size
+        self.ocr_kwargs = ocr_kwargs or dict(OCR_KWARGS)
+        self._factory = factory or _backend_factory
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._in_use = 0
+        self._waiting = 0
+        self._checkouts = 0
+        self._timeouts = 0
+        self._wait_seconds = 0.0
+        self.load_seconds = []
+
+        # Load every engine up front so no session pays for a cold model
+        for _ in range(size):
+            start = time.perf_counter()
+            engine = self._factory(**self.ocr_kwargs)
+            self.load_seconds.append(time.perf_counter() - start)
+            self.backend = getattr(engine, "name", type(engine).__name__)
+            self._idle.put(engine)
+
+    def checkout(self, timeout=CHECKOUT_TIMEOUT):
+        with self._lock:
+            self._waiting += 1
+        start = time.perf_counter()
+        try:
+            engine = self._idle.get(timeout=timeout)
+        except queue.Empty:
+            with self._lock:
+                self._timeouts += 1
+            raise OCRPoolTimeout(f"No OCR engine free after {timeout}s ({self.size} in pool)")
+        finally:
+            waited = time.perf_counter() - start
+            with self._lock:
+                self._waiting -= 1
+                self._wait_seconds += waited
+        with self._lock:
+            self._in_use += 1
+            self._checkouts += 1
+        return engine
+
+    def checkin(self, engine):
+        with self._lock:
+            self._in_use -= 1
+        self._idle.put(engine)
+
+    @contextmanager
+    def engine(self, timeout=CHECKOUT_TIMEOUT):
+        engine = self.checkout(timeout)
+        try:
+            yield engine
+        finally:
+            self.checkin(engine)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "backend": self.backend,
+                "size": self.size,
+                "in_use": self._in_use,
+                "available": self.size - self._in_use,
+                "waiting": self._waiting,
+                "checkouts": self._checkouts,
+                "timeouts": self._timeouts,
+                "avg_wait_seconds": self._wait_seconds / self._checkouts if self._checkouts else 0.0,
+                "load_seconds_total": sum(self.load_seconds),
+                "load_seconds_per_engine": list(self.load_seconds),
+            }
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_ocr_pool(size=None):
+    """Return the shared pool, building it on first use."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = OCREnginePool(size=size or POOL_SIZE)
+    return _pool
@@ -0,0 +1,151 @@
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from ocr_pool import POOL_SIZE
+from preprocess import MAX_SIDE
+
+# ------------------------------------------------------------
+# Multi-page PDF marksheets
+# ------------------------------------------------------------
+# Pages are handled one at a time, in order:
+#   - a page with an embedded text layer is read directly (no OCR at all)
+#   - any other page is rasterized only then, at a DPI capped so the longest
+#     side fits MAX_SIDE, and handed to a thread pool for OCR
+# Finished pages are yielded in page order as soon as they are ready, so
+# callers can parse page 1 while later pages are still being OCR'd. At most
+# `workers` rendered pages are held in memory at once.
+
+PDF_DPI = int(os.environ.get("SKILLBOT_PDF_DPI", "200"))
+# OCR threads share the engine pool, so more threads than engines only queue up
+PDF_WORKERS = int(os.environ.get("SKILLBOT_PDF_WORKERS", str(POOL_SIZE)))
+# Pages whose text layer has fewer characters than this are treated as scans
+MIN_TEXT_CHARS = int(os.environ.get("SKILLBOT_PDF_MIN_TEXT_CHARS", "20"))
+# Horizontal gap (in word heights) that separates two table cells on one line
+GAP_FACTOR = 1.0
+
+PDF_MAGIC = b"%PDF-"
+
+
+def _pymupdf():
+    try:
+        import pymupdf
+    except ImportError:
+        try:
+            import fitz as pymupdf  # PyMuPDF < 1.24
+        except ImportError:
+            raise RuntimeError("PDF marksheets need PyMuPDF: pip install pymupdf") from None
+    return pymupdf
+
+
+def is_pdf(source):
+    """True for PDF bytes/buffers, or a path to a PDF file (checked by magic bytes)."""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        head = bytes(source[:len(PDF_MAGIC)])
+    else:
+        with open(source, "rb") as f:
+            head = f.read(len(PDF_MAGIC))
+    return head == PDF_MAGIC
+
+
+class PDFPage:
+    __slots__ = ("number", "text", "boxes", "source")
+
+    def __init__(self, number, text, boxes, source):
+        self.number = number  # 0-based page index
+        self.text = text      # token list, same shape as OCR output
+        self.boxes = boxes    # [x0, y0, x1, y1, confidence] per token (pixels at render DPI)
+        self.source = source  # "text" (embedded layer) or "ocr"
+
+
+def page_dpi(page, dpi=PDF_DPI, max_side=MAX_SIDE):
+    # Page sizes are in points (1/72 inch); never render larger than OCR will use
+    longest = max(page.rect.width, page.rect.height)
+    if max_side and longest:
+        dpi = min(dpi, max_side * 72 / longest)
+    return dpi
+
+
+def text_layer(page, dpi=PDF_DPI):
+    """
+    Embedded text as (tokens, boxes) in reading order. Words on one text line
+    are split where the gap is wider than GAP_FACTOR x the word height, so table
+    cells come out as separate tokens, the way OCR detects them.
+    """
+    scale = dpi / 72
+    text, boxes = [], []
+    last_line, last_x1 = None, None
+    for x0, y0, x1, y1, word, block, line, _ in page.get_text("words", sort=True):
+        gap = GAP_FACTOR * (y1 - y0)
+        if (block, line) == last_line and x0 - last_x1 <= gap:
+            text[-1] += " " + word
+            box = boxes[-1]
+            box[1], box[2], box[3] = min(box[1], y0), max(box[2], x1), max(box[3], y1)
+        else:
+            text.append(word)
+            boxes.append([x0, y0, x1, y1])
+        last_line, last_x1 = (block, line), x1
+    return text, [[v * scale for v in box] + [1.0] for box in boxes]
+
+
+def render_page(page, dpi=PDF_DPI):
+    """Rasterize one page to a BGR uint8 array."""
+    pix = page.get_pixmap(dpi=int(dpi), alpha=False)
+    img = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.stride)
+    img = img[:, :pix.width * pix.n].reshape(pix.height, pix.width, pix.n)
+    if pix.n == 1:
+        return cv2.cvtColor(img, cv2.COLOR_GRAY2BGR)
+    return cv2.cvtColor(img, cv2.COLOR_RGB2BGR)
+
+
+def iter_pdf_pages(source, ocr, dpi=PDF_DPI, workers=PDF_WORKERS, min_text_chars=MIN_TEXT_CHARS):
+    """
+    source: path, or the PDF's bytes
+    ocr: callable(BGR image) -> (text_list, boxes), run on worker threads
+    Yields a PDFPage per page, in page order.
+    """
+    pymupdf = _pymupdf()
+    if isinstance(source, (str, os.PathLike)):
+        doc = pymupdf.open(source)
+    else:
+        doc = pymupdf.open(stream=source, filetype="pdf")
+
+    workers = max(1, workers)
+    # PyMuPDF documents are not thread-safe, so all page access stays on this
+    # thread; only the rendered arrays go to the pool
+    with doc, ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pdf-ocr") as pool:
+        pending = deque()  # PDFPage, or (number, future) for pages being OCR'd
+        in_flight = 0
+
+        def finish(item):
+            if isinstance(item, PDFPage):
+                return item
+            number, future = item
+            text, boxes = future.result()
+            return PDFPage(number, text, boxes, "ocr")
+
+        for number in range(doc.page_count):
+            page = doc.load_page(number)
+            render_dpi = page_dpi(page, dpi)
+            text, boxes = text_layer(page, render_dpi)
+            if sum(len(t) for t in text) >= min_text_chars:
+                pending.append(PDFPage(number, text, boxes, "text"))
+            else:
+                pending.append((number, pool.submit(ocr, render_page(page, render_dpi))))
+                in_flight += 1
+
+            # Hand back whatever is ready at the front; block on it only when
+            # enough rendered pages are already waiting for an engine
+            while pending:
+                head = pending[0]
+                if not isinstance(head, PDFPage) and not head[1].done() and in_flight < workers:
+                    break
+                if not isinstance(head, PDFPage):
+                    in_flight -= 1
+                yield finish(pending.popleft())
+
+        while pending:
+            yield finish(pending.popleft())
@@ -0,0 +1,409 @@
+import atexit
+import http.client
+import json
+import logging
+import math
+import os
+import queue
+import random
+import threading
+import time
+import urllib.parse
+from collections import deque
+from contextlib import contextmanager
+
+import metrics
+
+# ------------------------------------------------------------
+# Pooled Supabase access and write-behind buffering
+# ------------------------------------------------------------
+# Test results and profiles are written by a background thread instead of the
+# Streamlit script thread: rows are buffered per table and sent as one bulk
+# PostgREST insert/upsert once BATCH_ROWS rows are waiting or the oldest row
+# is FLUSH_SECONDS old. The REST client keeps a small pool of keep-alive
+# connections, so a burst of saves costs a handful of round-trips instead of
+# one per row. Auth and storage still go through the supabase client, created
+# once per process by get_client().
+#
+# SUPABASE_URL and SUPABASE_KEY must be set in the environment; nothing is
+# baked into the code. Pointing SUPABASE_URL at a local HTTP server
+# (http://127.0.0.1:PORT) that answers POST /rest/v1/<table> is enough to
+# exercise the writer offline (see test_persistence.py).
+
+log = logging.getLogger(__name__)
+
+SUPABASE_URL = os.environ.get("SUPABASE_URL")
+SUPABASE_KEY = os.environ.get("SUPABASE_KEY")
+
+HTTP_POOL_SIZE = int(os.environ.get("SKILLBOT_HTTP_POOL_SIZE", "4"))
+HTTP_TIMEOUT = float(os.environ.get("SKILLBOT_HTTP_TIMEOUT", "10"))
+BATCH_ROWS = int(os.environ.get("SKILLBOT_WRITE_BATCH_ROWS", "200"))
+FLUSH_SECONDS = float(os.environ.get("SKILLBOT_WRITE_FLUSH_SECONDS", "1.0"))
+MAX_BUFFERED = int(os.environ.get("SKILLBOT_WRITE_MAX_BUFFERED", "10000"))
+ENQUEUE_TIMEOUT = float(os.environ.get("SKILLBOT_WRITE_ENQUEUE_TIMEOUT", "5"))
+MAX_RETRIES = int(os.environ.get("SKILLBOT_WRITE_RETRIES", "5"))
+BACKOFF_SECONDS = float(os.environ.get("SKILLBOT_WRITE_BACKOFF", "0.5"))
+BACKOFF_MAX = float(os.environ.get("SKILLBOT_WRITE_BACKOFF_MAX", "30"))
+KEEP_FAILED = int(os.environ.get("SKILLBOT_WRITE_KEEP_FAILED", "1000"))
+
+# Worth retrying: rate limited, timed out or a server-side error
+RETRY_STATUS = {408, 429, 500, 502, 503, 504}
+
+
+class WriteError(RuntimeError):
+    def __init__(self, message, status=None, retryable=True):
+        super().__init__(message)
+        self.status = status
+        self.retryable = retryable
+
+
+class WriteBufferFull(RuntimeError):
+    """Raised when the write-behind buffer stays full for ENQUEUE_TIMEOUT seconds."""
+
+
+def _credentials(url=None, key=None):
+    url, key = url or SUPABASE_URL, key or SUPABASE_KEY
+    if not url or not key:
+        raise RuntimeError("Set SUPABASE_URL and SUPABASE_KEY in the environment to use Supabase")
+    return url, key
+
+
+# ------------------------------------------------------------
+# supabase client (auth, storage)
+# ------------------------------------------------------------
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """The process-wide supabase client, created on first use."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                from supabase import create_client
+                _client = create_client(*_credentials())
+    return _client
+
+
+# ------------------------------------------------------------
+# PostgREST over pooled keep-alive connections
+# ------------------------------------------------------------
+def _json_default(value):
+    # numpy scalars (pandas values) -> Python numbers
+    if hasattr(value, "item"):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class RestClient:
+    def __init__(self, url=None, key=None, pool_size=HTTP_POOL_SIZE, timeout=HTTP_TIMEOUT):
+        url, key = _credentials(url, key)
+        parts = urllib.parse.urlsplit(url)
+        self._connection_class = (http.client.HTTPSConnection if parts.scheme == "https"
+                                  else http.client.HTTPConnection)
+        self._host = parts.netloc
+        self._base = parts.path.rstrip("/") + "/rest/v1/"
+        self._headers = {"apikey": key, "Authorization": f"Bearer {key}",
+                         "Content-Type": "application/json", "Connection": "keep-alive"}
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._opened = 0
+
+    @contextmanager
+    def _connection(self):
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = self._connection_class(self._host, timeout=self.timeout)
+            self._opened += 1
+        try:
+            yield conn
+        except BaseException:
+            # The connection may hold half a response; never reuse it
+            conn.close()
+            raise
+        if self._idle.qsize() < self.pool_size:
+            self._idle.put(conn)
+        else:
+            conn.close()
+
+    def _post(self, table, rows, prefer, params=None):
+        path = self._base + urllib.parse.quote(table)
+        if params:
+            path += "?" + urllib.parse.urlencode(params)
+        try:
+            body = json.dumps(rows, allow_nan=False, default=_json_default).encode()
+        except (TypeError, ValueError) as e:
+            raise WriteError(f"{table}: rows are not JSON serializable: {e}", retryable=False) from e
+        headers = dict(self._headers, Prefer=prefer)
+        try:
+            with self._connection() as conn:
+                conn.request("POST", path, body=body, headers=headers)
+                response = conn.getresponse()
+                data = response.read()
+                if response.getheader("Connection", "").lower() == "close":
+                    conn.close()
+        except (OSError, http.client.HTTPException) as e:
+            raise WriteError(f"{table}: {type(e).__name__}: {e}") from e
+        if response.status >= 300:
+            raise WriteError(f"{table}: HTTP {response.status}: {data[:200].decode(errors='replace')}",
+                             status=response.status, retryable=response.status in RETRY_STATUS)
+
+    def insert(self, table, rows):
+        self._post(table, rows, "return=minimal")
+
+    def upsert(self, table, rows, on_conflict=None):
+        params = {"on_conflict": on_conflict} if on_conflict else None
+        self._post(table, rows, "resolution=merge-duplicates,return=minimal", params)
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+# ------------------------------------------------------------
+# Write-behind buffer
+# ------------------------------------------------------------
+class _Pending:
+    """Rows waiting for one table. Upserts keep only the latest row per key."""
+    __slots__ = ("mode", "key", "rows", "since")
+
+    def __init__(self, mode, key):
+        self.mode = mode
+        self.key = key
+        self.rows = {} if mode == "upsert" else []
+        self.since = time.monotonic()
+
+    def add(self, row):
+        if self.mode == "upsert":
+            # Re-adding a key moves it to the end so the latest version wins
+            self.rows.pop(row[self.key], None)
+            self.rows[row[self.key]] = row
+        else:
+            self.rows.append(row)
+
+    def take(self):
+        return list(self.rows.values()) if self.mode == "upsert" else self.rows
+
+
+class WriteBehindBuffer:
+    def __init__(self, client=None, batch_rows=BATCH_ROWS, flush_seconds=FLUSH_SECONDS,
+                 max_buffered=MAX_BUFFERED, max_retries=MAX_RETRIES, backoff=BACKOFF_SECONDS):
+        if batch_rows < 1:
+            raise ValueError("batch_rows must be at least 1")
+        self._client = client or RestClient()
+        self.batch_rows = batch_rows
+        self.flush_seconds = flush_seconds
+        self.max_buffered = max_buffered
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.failed = deque(maxlen=KEEP_FAILED)  # (table, row, error) given up on
+        self._pending = {}
+        self._buffered = 0
+        self._inflight = 0
+        self._flush_requested = False
+        self._closed = False
+        self._cond = threading.Condition()
+        self._counts = {"rows_written": 0, "rows_failed": 0, "batches": 0, "retries": 0}
+        self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def insert(self, table, row):
+        self._add(table, row, "insert", None)
+
+    def upsert(self, table, row, key):
+        """Queue an upsert; rows with the same row[key] in one batch collapse to the latest."""
+        self._add(table, row, "upsert", key)
+
+    def _add(self, table, row, mode, key):
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("write-behind buffer is closed")
+            deadline = time.monotonic() + ENQUEUE_TIMEOUT
+            while self._buffered >= self.max_buffered:
+                self._flush_requested = True
+                self._cond.notify_all()
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise WriteBufferFull(f"{self._buffered} rows already waiting to be written")
+                self._cond.wait(remaining)
+            pending = self._pending.get(table)
+            if pending is None:
+                pending = self._pending[table] = _Pending(mode, key)
+            elif (pending.mode, pending.key) != (mode, key):
+                raise ValueError(f"{table} is already buffered as {pending.mode}")
+            before = len(pending.rows)
+            pending.add(row)
+            self._buffered += len(pending.rows) - before
+            if len(pending.rows) >= self.batch_rows:
+                self._cond.notify_all()
+            elif before == 0:
+                # New deadline for the flusher to wait on
+                self._cond.notify_all()
+
+    def flush(self, timeout=None):
+        """Write everything buffered now; True once nothing is pending or in flight."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            self._flush_requested = True
+            self._cond.notify_all()
+            while self._buffered or self._inflight:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def close(self, timeout=30):
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+        self._client.close()
+
+    # -------------------- flusher thread --------------------
+    def _due(self, now):
+        """Tables ready to be written and seconds until the next one is."""
+        if self._flush_requested or self._closed:
+            return list(self._pending), None
+        ready, wait = [], None
+        for table, pending in self._pending.items():
+            left = pending.since + self.flush_seconds - now
+            if len(pending.rows) >= self.batch_rows or left <= 0:
+                ready.append(table)
+            elif wait is None or left < wait:
+                wait = left
+        return ready, wait
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while True:
+                    ready, wait = self._due(time.monotonic())
+                    if ready or (self._closed and not self._pending):
+                        break
+                    self._flush_requested = False
+                    self._cond.wait(wait)
+                if not ready:
+                    return
+                batches = []
+                for table in ready:
+                    pending = self._pending.pop(table)
+                    rows = pending.take()
+                    self._buffered -= len(rows)
+                    self._inflight += len(rows)
+                    batches.append((table, pending, rows))
+                self._cond.notify_all()  # wakes writers blocked on a full buffer
+            for table, pending, rows in batches:
+                for start in range(0, len(rows), self.batch_rows):
+                    chunk = rows[start:start + self.batch_rows]
+                    self._write(table, pending, chunk)
+                    with self._cond:
+                        self._inflight -= len(chunk)
+                        self._cond.notify_all()
+
+    def _write(self, table, pending, rows):
+        for attempt in range(self.max_retries + 1):
+            try:
+                if pending.mode == "upsert":
+                    self._client.upsert(table, rows, on_conflict=pending.key)
+                else:
+                    self._client.insert(table, rows)
+            except Exception as e:
+                # Anything but a retryable WriteError is final; the flusher thread must survive it
+                if not getattr(e, "retryable", False) or attempt == self.max_retries or self._closed and attempt:
+                    self._give_up(table, rows, e)
+                    return
+                self._counts["retries"] += 1
+                metrics.incr("persistence.retries")
+                # Exponential backoff with jitter so a recovering server isn't hit in lockstep
+                delay = min(BACKOFF_MAX, self.backoff * 2 ** attempt) * (0.5 + random.random())
+                log.warning("Retrying %d %s rows in %.1fs: %s", len(rows), table, delay, e)
+                time.sleep(delay)
+            else:
+                self._counts["batches"] += 1
+                self._counts["rows_written"] += len(rows)
+                metrics.incr("persistence.batches")
+                metrics.incr("persistence.rows_written", len(rows))
+                return
+
+    def _give_up(self, table, rows, error):
+        log.error("Dropping %d %s rows: %s", len(rows), table, error)
+        self._counts["rows_failed"] += len(rows)
+        metrics.incr("persistence.rows_failed", len(rows))
+        for row in rows:
+            self.failed.append((table, row, str(error)))
+
+    def stats(self):
+        with self._cond:
+            return dict(self._counts, buffered=self._buffered, inflight=self._inflight,
+                        tables=len(self._pending))
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_writer():
+    """The process-wide write-behind buffer, created on first use."""
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = WriteBehindBuffer()
+    return _writer
+
+
+# ------------------------------------------------------------
+# Rows the apps write
+# ------------------------------------------------------------
+RIASEC_COLUMNS = {c: f"riasec_{c}" for c in "RIASEC"}
+TCI_COLUMNS = {
+    "Persistence": "tci_Persistence",
+    "Harm Avoidance": "tci_HarmAvoidance",
+    "Cooperativeness": "tci_Cooperativeness",
+    "Novelty Seeking": "tci_NoveltySeeking",
+    "Reward Dependence": "tci_RewardDependence",
+    "Self-Directedness": "tci_SelfDirectedness",
+    "Self-Transcendence": "tci_SelfTranscendence",
+}
+
+
+def _plain(value):
+    # numpy scalars -> Python numbers; NaN has no JSON form, so it becomes null
+    if value is None:
+        return None
+    value = value.item() if hasattr(value, "item") else value
+    return None if isinstance(value, float) and math.isnan(value) else value
+
+
+def test_results_row(user_id, riasec, tci):
+    """One test_results row from score_riasec / score_tci Series."""
+    riasec, tci = riasec.to_dict(), tci.to_dict()
+    row = {"user_id": user_id}
+    row.update({column: _plain(riasec.get(c)) for c, column in RIASEC_COLUMNS.items()})
+    row.update({column: _plain(tci.get(t)) for t, column in TCI_COLUMNS.items()})
+    return row
+
+
+def queue_test_results(user_id, riasec, tci):
+    get_writer().insert("test_results", test_results_row(user_id, riasec, tci))
+
+
+def queue_profile(user_id, name, gender, age, qualification, marksheet_url):
+    get_writer().upsert("profiles", {
+        "user_id": user_id,
+        "full_name": name,
+        "gender": gender,
+        "age": _plain(age),
+        "qualification": qualification,
+        "marksheet_url": marksheet_url,
+    }, key="user_id")
@@ -0,0 +1,147 @@
+from array import array
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from question_bank import get_riasec_bank, get_tci_bank
+
+# ------------------------------------------------------------
+# RIASEC / TCI scoring kernel
+# ------------------------------------------------------------
+# Answers are encoded to small integer option codes, turned into scores with
+# one lookup-array index, and summed per category with a single np.bincount
+# (offset per response set, so a 2-D matrix of thousands of stored response
+# sets costs one call). The category index comes precomputed with the
+# question bank, and kernels are cached per bank.
+#
+# Results match the pandas code this replaces: unknown answers score NaN and
+# are skipped, RIASEC is the per-category mean sorted high to low, TCI is the
+# per-trait sum in trait order.
+
+
+class AnswerScale:
+    """Answer labels in option order and the score of each."""
+    __slots__ = ("labels", "scores", "_codes")
+
+    def __init__(self, mapping):
+        self.labels = tuple(mapping)
+        self._codes = {label: code for code, label in enumerate(self.labels)}
+        # The trailing NaN is what code -1 (an unknown answer) looks up
+        scores = np.array([*mapping.values(), np.nan], dtype=float)
+        scores.flags.writeable = False
+        self.scores = scores
+
+    def code(self, label):
+        """Option code of one answer label, -1 if unknown."""
+        return self._codes.get(label, -1)
+
+    def encode(self, answers):
+        """Option codes (int8, -1 for unknown labels) for a 1-D or 2-D sequence of labels."""
+        answers = np.asarray(answers, dtype=object)
+        codes = np.fromiter((self._codes.get(a, -1) for a in answers.ravel()),
+                            dtype=np.int8, count=answers.size)
+        return codes.reshape(answers.shape)
+
+
+AGREE_SCALE = AnswerScale({"Strongly Disagree": 1, "Disagree": 2, "Neutral": 3, "Agree": 4, "Strongly Agree": 5})
+LIKE_SCALE = AnswerScale({"Strongly Dislike": 1, "Dislike": 2, "Unsure": 3, "Like": 4, "Strongly Like": 5})
+TRUE_FALSE_SCALE = AnswerScale({"T": 1, "F": 0})
+
+
+class ScoringKernel:
+    def __init__(self, bank, scale, how="mean"):
+        if how not in ("mean", "sum"):
+            raise ValueError("how must be 'mean' or 'sum'")
+        self.bank = bank
+        self.scale = scale
+        self.how = how
+        self.index = pd.Index(bank.categories, name=bank.category_column)
+
+    def _aggregate(self, codes):
+        """codes: (sets, questions) option codes -> (sets, categories) float scores."""
+        sets, questions = codes.shape
+        if questions != len(self.bank):
+            raise ValueError(f"Expected {len(self.bank)} answers per set, got {questions}")
+        k = len(self.bank.categories)
+        values = self.scale.scores[codes]
+        answered = ~np.isnan(values)
+        # Row r, category c lands in bin r * k + c
+        bins = (np.arange(sets)[:, None] * k + self.bank.codes).ravel()
+        totals = np.bincount(bins, weights=np.where(answered, values, 0).ravel(), minlength=sets * k)
+        totals = totals.reshape(sets, k)
+        if self.how == "sum":
+            return totals, answered.all()
+        if answered.all():
+            counts = np.broadcast_to(self.bank.counts, (sets, k))
+        else:
+            counts = np.bincount(bins, weights=answered.ravel(), minlength=sets * k).reshape(sets, k)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return totals / counts, True
+
+    def _result_dtype(self, complete):
+        # pandas sums integer scores to int64 unless a NaN turned the column into floats
+        return np.int64 if self.how == "sum" and complete else float
+
+    def _codes(self, answers):
+        # Labels are encoded; option codes (e.g. a session's array('b')) are used as is
+        answers = np.asarray(answers)
+        if answers.dtype.kind in "iu":
+            return answers.astype(np.int8, copy=False)
+        return self.scale.encode(answers)
+
+    def score(self, answers):
+        """Scores for one response set (labels or option codes) as a Series indexed by category."""
+        codes = self._codes(answers)
+        if codes.ndim != 1:
+            raise ValueError("score() takes one response set; use score_many() for a matrix")
+        values, complete = self._aggregate(codes[None, :])
+        return pd.Series(values[0].astype(self._result_dtype(complete)), index=self.index, name="score")
+
+    def score_many(self, answers):
+        """Scores for a (sets, questions) matrix of labels or option codes, one row per set."""
+        values, complete = self._aggregate(self._codes(answers))
+        return pd.DataFrame(values.astype(self._result_dtype(complete)), columns=self.index)
+
+
+@lru_cache(maxsize=16)
+def get_kernel(bank, scale, how="mean"):
+    # Banks are replaced (not mutated) when their file changes, so the bank
+    # object itself is the cache key
+    return ScoringKernel(bank, scale, how)
+
+
+def score_riasec(answers, scale=AGREE_SCALE, bank=None):
+    """Mean score per RIASEC category, highest first."""
+    kernel = get_kernel(bank or get_riasec_bank(), scale, "mean")
+    return kernel.score(answers).sort_values(ascending=False)
+
+
+def score_tci(answers, scale=TRUE_FALSE_SCALE, bank=None):
+    """Summed score per TCI trait, in trait order."""
+    return get_kernel(bank or get_tci_bank(), scale, "sum").score(answers)
+
+
+# ------------------------------------------------------------
+# Compact storage of results (see session_model.py)
+# ------------------------------------------------------------
+def pack_scores(scores, bank):
+    """Series from score_riasec / score_tci -> array('d') in the bank's category order."""
+    return array("d", scores.reindex(bank.categories).to_numpy(dtype=float))
+
+
+def unpack_riasec(values, bank=None):
+    """Inverse of pack_scores for score_riasec output."""
+    bank = bank or get_riasec_bank()
+    index = pd.Index(bank.categories, name=bank.category_column)
+    scores = pd.Series(np.frombuffer(values, dtype=float), index=index, name="score")
+    return scores.sort_values(ascending=False)
+
+
+def unpack_tci(values, bank=None):
+    """Inverse of pack_scores for score_tci output (integer sums come back as int64)."""
+    bank = bank or get_tci_bank()
+    data = np.frombuffer(values, dtype=float)
+    if np.isfinite(data).all() and (data == np.round(data)).all():
+        data = data.astype(np.int64)
+    return pd.Series(data, index=pd.Index(bank.categories, name=bank.category_column), name="score")
@@ -0,0 +1,111 @@
+import os
+import threading
+import time
+from collections import defaultdict
+
+import cv2
+import numpy as np
+
+# ------------------------------------------------------------
+# Adaptive image preprocessing before OCR
+# ------------------------------------------------------------
+# Phone photos of marksheets are often 12+ megapixels while the text
+# detector works on ~1000-1600px images, so the image is downscaled first
+# and the expensive filters run only when cheap estimates ask for them:
+#   - denoise (bilateral filter) when the estimated noise sigma is high
+#   - contrast boost (CLAHE) when the 1st-99th percentile grey spread is low
+#   - binarize (adaptive threshold) only when a caller wants the mask
+# Every stage is timed; stage_stats() reports totals per stage across calls.
+
+MAX_SIDE = int(os.environ.get("SKILLBOT_OCR_MAX_SIDE", "1600"))
+NOISE_THRESHOLD = float(os.environ.get("SKILLBOT_OCR_NOISE_THRESHOLD", "6.0"))
+CONTRAST_THRESHOLD = float(os.environ.get("SKILLBOT_OCR_CONTRAST_THRESHOLD", "80.0"))
+
+# Kernel for Immerkaer's fast noise-variance estimate
+_NOISE_KERNEL = np.array([[1, -2, 1], [-2, 4, -2], [1, -2, 1]], dtype=np.float32)
+
+_stats_lock = threading.Lock()
+_stage_totals = defaultdict(lambda: [0, 0.0])  # stage -> [calls, seconds]
+
+
+def record_stage(stage, seconds):
+    with _stats_lock:
+        total = _stage_totals[stage]
+        total[0] += 1
+        total[1] += seconds
+
+
+def stage_stats():
+    """{stage: {"calls", "total_ms", "avg_ms"}} across all preprocessing/OCR calls."""
+    with _stats_lock:
+        return {
+            stage: {"calls": calls, "total_ms": seconds * 1000, "avg_ms": seconds * 1000 / calls}
+            for stage, (calls, seconds) in _stage_totals.items()
+        }
+
+
+def estimate_noise(gray):
+    h, w = gray.shape
+    if h < 3 or w < 3:
+        return 0.0
+    response = cv2.filter2D(gray.astype(np.float32), -1, _NOISE_KERNEL)
+    return float(np.sqrt(np.pi / 2) * np.abs(response[1:-1, 1:-1]).sum() / (6 * (w - 2) * (h - 2)))
+
+
+def estimate_contrast(gray):
+    # Percentile spread on a subsample: a white page with dark text scores high
+    # even though most pixels are background
+    low, high = np.percentile(gray[::4, ::4], [1, 99])
+    return float(high - low)
+
+
+def preprocess(img, max_side=MAX_SIDE, noise_threshold=NOISE_THRESHOLD,
+               contrast_threshold=CONTRAST_THRESHOLD, binarize=False):
+    """
+    img: BGR (or greyscale) uint8 array, e.g. from cv2.imread / cv2.imdecode
+    Returns (image for OCR, info) where info holds the estimates, the stages
+    applied, per-stage timings in ms and, with binarize=True, the "thresh" mask.
+    """
+    info = {"applied": [], "timings_ms": {}}
+
+    def timed(stage, func, *args):
+        start = time.perf_counter()
+        out = func(*args)
+        elapsed = time.perf_counter() - start
+        info["timings_ms"][stage] = elapsed * 1000
+        record_stage(stage, elapsed)
+        return out
+
+    # 1) Cap resolution; INTER_AREA keeps strokes clean when shrinking
+    h, w = img.shape[:2]
+    scale = min(1.0, max_side / max(h, w)) if max_side else 1.0
+    info["scale"] = scale
+    if scale < 1.0:
+        size = (max(1, round(w * scale)), max(1, round(h * scale)))
+        img = timed("resize", cv2.resize, img, size, 0, 0, cv2.INTER_AREA)
+        info["applied"].append("resize")
+
+    gray = timed("grayscale", cv2.cvtColor, img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
+
+    # 2) Quick estimates decide which filters are worth their cost
+    info["noise"] = timed("estimate_noise", estimate_noise, gray)
+    info["contrast"] = timed("estimate_contrast", estimate_contrast, gray)
+
+    if info["noise"] > noise_threshold:
+        img = timed("denoise", cv2.bilateralFilter, img, 9, 75, 75)
+        info["applied"].append("denoise")
+        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
+
+    if info["contrast"] < contrast_threshold:
+        clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
+        gray = timed("contrast", clahe.apply, gray)
+        img = cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR)
+        info["applied"].append("contrast")
+
+    if binarize:
+        # Adaptive threshold (works for colored/noisy marksheets)
+        info["thresh"] = timed("binarize", cv2.adaptiveThreshold, gray, 255,
+                               cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY_INV, 31, 10)
+        info["applied"].append("binarize")
+
+    return img, info
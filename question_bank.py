@@ -0,0 +1,118 @@
+import csv
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+# ------------------------------------------------------------
+# Static question and career banks
+# ------------------------------------------------------------
+# Streamlit re-executes every app script on each click, so the CSVs are
+# parsed here once per process into immutable tuples plus a small array of
+# category codes, and shared by every session. Each access only stats the
+# file; the bank is re-read when its mtime changes.
+
+QUESTIONS_FILE = "questions.csv"
+TCI_QUESTIONS_FILE = "tci_questions.csv"
+CAREERS_FILE = "careers.csv"
+
+
+class QuestionBank:
+    """
+    Questions in file order with their category. `categories` holds the sorted
+    distinct labels (the order groupby uses), `codes[i]` indexes into it and
+    `counts[c]` is the number of questions in category c (used for scoring).
+    """
+    __slots__ = ("ids", "questions", "categories", "codes", "counts", "category_column")
+
+    def __init__(self, questions, labels, ids=None, category_column="category"):
+        self.ids = tuple(ids) if ids is not None else None
+        self.questions = tuple(questions)
+        self.categories = tuple(sorted(set(labels)))
+        index = {label: code for code, label in enumerate(self.categories)}
+        codes = np.fromiter((index[label] for label in labels), dtype=np.int8, count=len(labels))
+        codes.flags.writeable = False
+        self.codes = codes
+        counts = np.bincount(codes, minlength=len(self.categories))
+        counts.flags.writeable = False
+        self.counts = counts
+        self.category_column = category_column
+
+    def __len__(self):
+        return len(self.questions)
+
+    def question(self, i):
+        return self.questions[i]
+
+    def category(self, i):
+        return self.categories[self.codes[i]]
+
+    def to_frame(self):
+        """A fresh DataFrame with the file's columns, for callers that add answer columns."""
+        data = {} if self.ids is None else {"id": list(self.ids)}
+        data["question"] = list(self.questions)
+        data[self.category_column] = [self.categories[c] for c in self.codes]
+        return pd.DataFrame(data)
+
+    @classmethod
+    def from_csv(cls, path, category_column="category"):
+        with open(path, newline="", encoding="utf-8") as f:
+            rows = list(csv.DictReader(f))
+        ids = [int(r["id"]) for r in rows] if rows and "id" in rows[0] else None
+        return cls([r["question"] for r in rows], [r[category_column] for r in rows],
+                   ids=ids, category_column=category_column)
+
+
+class CareerBank:
+    """RIASEC category -> tuple of example careers."""
+    __slots__ = ("_careers",)
+
+    def __init__(self, careers):
+        self._careers = {category: tuple(names) for category, names in careers.items()}
+
+    def __contains__(self, category):
+        return category in self._careers
+
+    def careers(self, category):
+        return self._careers.get(category, ())
+
+    @classmethod
+    def from_csv(cls, path):
+        # Rows are "R,Engineer, Electrician, ..." under a two-column header, so
+        # every field after the category is one career
+        with open(path, newline="", encoding="utf-8") as f:
+            reader = csv.reader(f)
+            next(reader, None)
+            return cls({row[0].strip(): [c.strip() for c in row[1:] if c.strip()] for row in reader if row})
+
+
+# ------------------------------------------------------------
+# Process-wide cache, refreshed on mtime change
+# ------------------------------------------------------------
+_banks = {}  # (path, loader name) -> (mtime_ns, bank)
+_banks_lock = threading.Lock()
+
+
+def _cached(path, name, loader):
+    mtime = os.stat(path).st_mtime_ns  # FileNotFoundError reaches the app as before
+    entry = _banks.get((path, name))
+    if entry is None or entry[0] != mtime:
+        with _banks_lock:
+            entry = _banks.get((path, name))
+            if entry is None or entry[0] != mtime:
+                entry = (mtime, loader(path))
+                _banks[(path, name)] = entry
+    return entry[1]
+
+
+def get_riasec_bank(path=QUESTIONS_FILE):
+    return _cached(path, "riasec", QuestionBank.from_csv)
+
+
+def get_tci_bank(path=TCI_QUESTIONS_FILE):
+    return _cached(path, "tci", lambda p: QuestionBank.from_csv(p, category_column="trait"))
+
+
+def get_career_bank(path=CAREERS_FILE):
+    return _cached(path, "careers", CareerBank.from_csv)
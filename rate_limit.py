@@ -0,0 +1,268 @@
+import hashlib
+import hmac
+import math
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict, deque
+
+import metrics
+
+# ------------------------------------------------------------
+# Login throttling
+# ------------------------------------------------------------
+# Every login attempt passes LoginGuard.check() before any password is hashed
+# or sent to Supabase:
+#
+# 1. negative cache: the exact email/password pair failed within the last
+#    NEGATIVE_TTL seconds, so it is rejected locally (credential-stuffing
+#    replays never reach the upstream)
+# 2. lockout: the email had MAX_FAILURES failures within FAILURE_WINDOW
+#    seconds (a sliding window of failure times)
+# 3. token buckets: one per client IP and one per email, refilled at a fixed
+#    rate with a small burst
+#
+# Buckets and failure windows live in a backend: in-process by default, or
+# SKILLBOT_RATE_LIMIT_BACKEND=sqlite to share them between the processes of a
+# node through skillbot.db. Counters go to metrics.py under "login.*".
+
+BACKEND = os.environ.get("SKILLBOT_RATE_LIMIT_BACKEND", "memory")
+MAX_KEYS = int(os.environ.get("SKILLBOT_RATE_LIMIT_MAX_KEYS", "100000"))
+IP_BURST = int(os.environ.get("SKILLBOT_LOGIN_IP_BURST", "20"))
+IP_PER_MINUTE = float(os.environ.get("SKILLBOT_LOGIN_IP_PER_MINUTE", "20"))
+EMAIL_BURST = int(os.environ.get("SKILLBOT_LOGIN_EMAIL_BURST", "5"))
+EMAIL_PER_MINUTE = float(os.environ.get("SKILLBOT_LOGIN_EMAIL_PER_MINUTE", "5"))
+MAX_FAILURES = int(os.environ.get("SKILLBOT_LOGIN_MAX_FAILURES", "5"))
+FAILURE_WINDOW = float(os.environ.get("SKILLBOT_LOGIN_FAILURE_WINDOW", "300"))
+NEGATIVE_TTL = float(os.environ.get("SKILLBOT_LOGIN_NEGATIVE_TTL", "30"))
+# Only behind a proxy that sets it; otherwise clients could pick their own IP
+TRUST_FORWARDED = os.environ.get("SKILLBOT_TRUST_FORWARDED", "0") == "1"
+
+ADMITTED, RATE_LIMITED, LOCKED, CACHED_FAILURE = "admitted", "rate_limited", "locked", "cached_failure"
+
+
+class Decision:
+    __slots__ = ("allowed", "reason", "retry_after")
+
+    def __init__(self, allowed, reason, retry_after=0.0):
+        self.allowed = allowed
+        self.reason = reason
+        self.retry_after = retry_after
+
+    def __bool__(self):
+        return self.allowed
+
+    @property
+    def message(self):
+        if self.reason == CACHED_FAILURE:
+            return "Invalid email or password."
+        wait = max(1, math.ceil(self.retry_after))
+        if self.reason == LOCKED:
+            return f"Too many failed attempts. Try again in {wait} seconds."
+        return f"Too many login attempts. Try again in {wait} seconds."
+
+
+# ------------------------------------------------------------
+# Backends
+# ------------------------------------------------------------
+class MemoryBackend:
+    """Buckets and failure windows in this process, least recently used keys evicted first."""
+
+    def __init__(self, max_keys=MAX_KEYS):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()  # key -> [tokens, updated]
+        self._events = OrderedDict()   # key -> deque of times
+        self._lock = threading.Lock()
+
+    def _touch(self, table, key, default):
+        entry = table.get(key)
+        if entry is None:
+            entry = table[key] = default()
+            while len(table) > self.max_keys:
+                table.popitem(last=False)
+        else:
+            table.move_to_end(key)
+        return entry
+
+    def take(self, key, burst, per_second, now):
+        """Take one token; (allowed, seconds until a token is available)."""
+        with self._lock:
+            bucket = self._touch(self._buckets, key, lambda: [float(burst), now])
+            bucket[0] = min(burst, bucket[0] + (now - bucket[1]) * per_second)
+            bucket[1] = now
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                return True, 0.0
+            return False, (1 - bucket[0]) / per_second
+
+    def add_event(self, key, now, window):
+        with self._lock:
+            events = self._touch(self._events, key, deque)
+            events.append(now)
+            while events and events[0] <= now - window:
+                events.popleft()
+
+    def events(self, key, now, window):
+        """Times of the events for key within the last `window` seconds, oldest first."""
+        with self._lock:
+            events = self._events.get(key)
+            if not events:
+                return []
+            while events and events[0] <= now - window:
+                events.popleft()
+            return list(events)
+
+    def clear_events(self, key):
+        with self._lock:
+            self._events.pop(key, None)
+
+
+class SQLiteBackend:
+    """The same state in skillbot.db, shared by every process on the node."""
+
+    def __init__(self, path=None):
+        from storage import DB_PATH, SQLiteRepository
+        self._db = SQLiteRepository(path or DB_PATH)
+
+    def take(self, key, burst, per_second, now):
+        conn = self._db.connection
+        # BEGIN IMMEDIATE serialises the read-modify-write across processes
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT tokens, updated FROM rate_buckets WHERE key = ?", (key,)).fetchone()
+            tokens = float(burst) if row is None else min(burst, row[0] + (now - row[1]) * per_second)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            conn.execute("INSERT INTO rate_buckets (key, tokens, updated) VALUES (?, ?, ?) "
+                         "ON CONFLICT(key) DO UPDATE SET tokens = excluded.tokens, updated = excluded.updated",
+                         (key, tokens, now))
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
+        return allowed, 0.0 if allowed else (1 - tokens) / per_second
+
+    def add_event(self, key, now, window):
+        with self._db.connection as conn:
+            conn.execute("DELETE FROM rate_events WHERE key = ? AND at <= ?", (key, now - window))
+            conn.execute("INSERT INTO rate_events (key, at) VALUES (?, ?)", (key, now))
+
+    def events(self, key, now, window):
+        rows = self._db.connection.execute(
+            "SELECT at FROM rate_events WHERE key = ? AND at > ? ORDER BY at", (key, now - window))
+        return [row[0] for row in rows]
+
+    def clear_events(self, key):
+        with self._db.connection as conn:
+            conn.execute("DELETE FROM rate_events WHERE key = ?", (key,))
+
+
+BACKENDS = {"memory": MemoryBackend, "sqlite": SQLiteBackend}
+
+
+# ------------------------------------------------------------
+# Guard
+# ------------------------------------------------------------
+class LoginGuard:
+    def __init__(self, backend=None, ip_burst=IP_BURST, ip_per_minute=IP_PER_MINUTE,
+                 email_burst=EMAIL_BURST, email_per_minute=EMAIL_PER_MINUTE, max_failures=MAX_FAILURES,
+                 failure_window=FAILURE_WINDOW, negative_ttl=NEGATIVE_TTL, max_keys=MAX_KEYS, clock=time.time):
+        self.backend = backend or BACKENDS[BACKEND]()
+        self.ip_limit = (ip_burst, ip_per_minute / 60)
+        self.email_limit = (email_burst, email_per_minute / 60)
+        self.max_failures = max_failures
+        self.failure_window = failure_window
+        self.negative_ttl = negative_ttl
+        self.max_keys = max_keys
+        self._clock = clock
+        # Keyed HMACs of failed email/password pairs -> expiry; the secret
+        # never leaves the process, so nothing here can be reversed
+        self._secret = secrets.token_bytes(32)
+        self._negative = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _fingerprint(self, email, password):
+        return hmac.new(self._secret, f"{email}\0{password}".encode("utf-8"), hashlib.sha256).digest()
+
+    def _reject(self, reason, retry_after=0.0):
+        metrics.incr("login.rejected")
+        metrics.incr(f"login.rejected.{reason}")
+        return Decision(False, reason, retry_after)
+
+    def check(self, ip, email, password):
+        """Whether this attempt may go on to verify the password."""
+        email = (email or "").strip().lower()
+        now = self._clock()
+
+        with self._lock:
+            expires = self._negative.get(self._fingerprint(email, password))
+        if expires is not None and expires > now:
+            return self._reject(CACHED_FAILURE)
+
+        failures = self.backend.events(f"fail:{email}", now, self.failure_window)
+        if len(failures) >= self.max_failures:
+            # Open again once enough failures have slid out of the window
+            oldest = failures[len(failures) - self.max_failures]
+            return self._reject(LOCKED, oldest + self.failure_window - now)
+
+        if ip:
+            allowed, retry_after = self.backend.take(f"ip:{ip}", *self.ip_limit, now)
+            if not allowed:
+                return self._reject(RATE_LIMITED, retry_after)
+        allowed, retry_after = self.backend.take(f"email:{email}", *self.email_limit, now)
+        if not allowed:
+            return self._reject(RATE_LIMITED, retry_after)
+
+        metrics.incr("login.admitted")
+        return Decision(True, ADMITTED)
+
+    def record_failure(self, email, password):
+        email = (email or "").strip().lower()
+        now = self._clock()
+        metrics.incr("login.failures")
+        self.backend.add_event(f"fail:{email}", now, self.failure_window)
+        with self._lock:
+            fingerprint = self._fingerprint(email, password)
+            self._negative.pop(fingerprint, None)
+            self._negative[fingerprint] = now + self.negative_ttl
+            # Oldest entries expire first, so trimming from the front is enough
+            while self._negative and (len(self._negative) > self.max_keys
+                                      or next(iter(self._negative.values())) <= now):
+                self._negative.popitem(last=False)
+
+    def record_success(self, email):
+        metrics.incr("login.successes")
+        self.backend.clear_events(f"fail:{(email or '').strip().lower()}")
+
+    def stats(self):
+        counters = metrics.snapshot()["counters"]
+        return {name[len("login."):]: value for name, value in counters.items() if name.startswith("login.")}
+
+
+_guard = None
+_guard_lock = threading.Lock()
+
+
+def get_login_guard():
+    """The process-wide login guard, created on first use."""
+    global _guard
+    if _guard is None:
+        with _guard_lock:
+            if _guard is None:
+                _guard = LoginGuard()
+    return _guard
+
+
+def client_ip():
+    """The current Streamlit client's IP address, or None outside a session."""
+    try:
+        import streamlit as st
+        if TRUST_FORWARDED:
+            forwarded = st.context.headers.get("X-Forwarded-For")
+            if forwarded:
+                return forwarded.split(",")[0].strip()
+        return st.context.ip_address
+    except Exception:
+        return None
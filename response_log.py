@@ -0,0 +1,322 @@
+import argparse
+import glob
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+import pandas as pd
+
+import metrics
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# ------------------------------------------------------------
+# Append-only log of quiz responses
+# ------------------------------------------------------------
+# save_responses used to read the whole responses.xlsx, add 30 rows and
+# rewrite it, so every submission cost O(all responses) and concurrent
+# sessions overwrote each other. Submissions are now appended as JSON lines to
+# current.jsonl under an exclusive file lock and fsynced, so each costs one
+# small write whatever the log size, and any number of processes can append.
+#
+# When current.jsonl reaches SEGMENT_BYTES it is sealed as a segment; once
+# COMPACT_SEGMENTS segments exist they are compacted into one Parquet part in
+# the background, and once MERGE_PARTS parts exist they are merged with the
+# base into a new base. ResponseLog.read() combines the base, parts and
+# segments, and `python response_log.py export` writes the Excel view on demand
+# to responses/responses-export.xlsx. The old responses/responses.xlsx is only
+# read once, when the log is first created.
+#
+#   responses/log/current.jsonl          open segment
+#   responses/log/segment-<ns>.jsonl     sealed segments
+#   responses/log/part-<ns>.parquet      compacted parts, named after the
+#                                        newest segment they contain
+#   responses/log/base-<ns>.parquet      every part up to part-<ns> merged
+
+RESPONSE_DIR = os.environ.get("SKILLBOT_RESPONSE_DIR", "responses")
+SEGMENT_BYTES = int(os.environ.get("SKILLBOT_RESPONSE_SEGMENT_BYTES", str(4 << 20)))
+COMPACT_SEGMENTS = int(os.environ.get("SKILLBOT_RESPONSE_COMPACT_SEGMENTS", "8"))
+MERGE_PARTS = int(os.environ.get("SKILLBOT_RESPONSE_MERGE_PARTS", "8"))
+LEGACY_EXCEL = "responses.xlsx"
+EXPORT_FILE = os.path.join(RESPONSE_DIR, "responses-export.xlsx")
+
+CURRENT = "current.jsonl"
+
+log = logging.getLogger(__name__)
+
+
+@contextmanager
+def _file_lock(path, shared=False, blocking=True):
+    """Cross-process lock on `path`; yields False if non-blocking and busy."""
+    with open(path, "a+b") as f:
+        try:
+            if fcntl is not None:
+                mode = fcntl.LOCK_SH if shared else fcntl.LOCK_EX
+                fcntl.flock(f.fileno(), mode if blocking else mode | fcntl.LOCK_NB)
+            else:
+                # msvcrt has no shared locks; readers simply take the exclusive one
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_LOCK if blocking else msvcrt.LK_NBLCK, 1)
+        except OSError:
+            if blocking:
+                raise
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _read_jsonl(path):
+    rows = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                rows.append(json.loads(line))
+            except json.JSONDecodeError:
+                # A write torn by a crash; the next append starts on a new line
+                continue
+    return rows
+
+
+class ResponseLog:
+    def __init__(self, root=RESPONSE_DIR, segment_bytes=SEGMENT_BYTES, compact_segments=COMPACT_SEGMENTS,
+                 merge_parts=MERGE_PARTS):
+        self.root = root
+        self.dir = os.path.join(root, "log")
+        self.segment_bytes = segment_bytes
+        self.compact_segments = compact_segments
+        self.merge_parts = merge_parts
+        os.makedirs(self.dir, exist_ok=True)
+        self._current = os.path.join(self.dir, CURRENT)
+        self._write_lock = os.path.join(self.dir, ".write.lock")
+        self._compact_lock = os.path.join(self.dir, ".compact.lock")
+        self._thread_lock = threading.Lock()
+        self._import_legacy_excel()
+
+    # -------------------- writing --------------------
+    def append(self, rows, **fields):
+        """
+        Append one submission. `rows` is a DataFrame or a list of dicts;
+        `fields` (e.g. username=...) are added to every row, along with a
+        shared submission_id and submitted_at. Returns the submission id.
+        """
+        records = rows.to_dict("records") if isinstance(rows, pd.DataFrame) else [dict(r) for r in rows]
+        submission_id = uuid.uuid4().hex
+        submitted_at = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+        for record in records:
+            record.update(fields, submission_id=submission_id, submitted_at=submitted_at)
+        data = "".join(json.dumps(r, default=_json_default, ensure_ascii=False) + "\n" for r in records)
+        data = data.encode("utf-8")
+
+        with self._thread_lock, _file_lock(self._write_lock):
+            with open(self._current, "ab") as f:
+                size = f.seek(0, os.SEEK_END)
+                if size and not self._ends_with_newline():
+                    data = b"\n" + data
+                # One write call per submission: it lands whole or (on a
+                # crash) as a trailing partial line that readers skip
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+                size += len(data)
+            sealed = size >= self.segment_bytes and self._seal()
+        if sealed and len(self._segments()) >= self.compact_segments:
+            threading.Thread(target=self._compact_in_background, name="response-compact", daemon=True).start()
+        return submission_id
+
+    def _ends_with_newline(self):
+        with open(self._current, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b"\n"
+
+    def _seal(self):
+        # Caller holds the write lock
+        if not os.path.exists(self._current) or os.path.getsize(self._current) == 0:
+            return False
+        os.replace(self._current, os.path.join(self.dir, f"segment-{time.time_ns()}.jsonl"))
+        return True
+
+    def _files(self, prefix, suffix):
+        return sorted(glob.glob(os.path.join(self.dir, f"{prefix}-*{suffix}")), key=_number)
+
+    def _base(self):
+        bases = self._files("base", ".parquet")
+        return bases[-1] if bases else None
+
+    def _parts(self, stale=False):
+        # Parts at or below the base's number are already merged into it
+        # (left over by a crash), as are older bases
+        base = self._base()
+        merged = _number(base) if base else -1
+        parts = [p for p in self._files("part", ".parquet") if (_number(p) <= merged) == stale]
+        if stale:
+            parts += [b for b in self._files("base", ".parquet") if b != base]
+        return parts
+
+    def _segments(self, stale=False):
+        # A part is named after the newest segment it holds, so a segment at or
+        # below that number is already compacted (left over by a crash)
+        parts, base = self._parts(), self._base()
+        done = _number(parts[-1]) if parts else _number(base) if base else -1
+        return [p for p in self._files("segment", ".jsonl") if (_number(p) <= done) == stale]
+
+    # -------------------- compaction --------------------
+    def compact(self, seal=False, blocking=True):
+        """
+        Merge sealed segments into one Parquet part. With seal=True the open
+        segment is sealed first, so everything logged so far is compacted.
+        Returns the number of rows compacted (None if another process is
+        already compacting and blocking is False).
+        """
+        with _file_lock(self._compact_lock, blocking=blocking) as locked:
+            if not locked:
+                return None
+            if seal:
+                with self._thread_lock, _file_lock(self._write_lock):
+                    self._seal()
+            for path in self._segments(stale=True) + self._parts(stale=True):
+                os.remove(path)
+            segments = self._segments()
+            rows = [row for path in segments for row in _read_jsonl(path)]
+            if rows:
+                part = os.path.join(self.dir, f"part-{_number(segments[-1])}.parquet")
+                _write_parquet(pd.DataFrame.from_records(rows), part)
+            for path in segments:
+                os.remove(path)
+            if len(self._parts()) >= self.merge_parts:
+                self._merge()
+            return len(rows)
+
+    def _merge(self):
+        # Caller holds the compact lock. The new base is named after the newest
+        # part it holds, so once it is in place the old base and the parts are
+        # stale and a crash before they are removed loses or repeats nothing
+        base, parts = self._base(), self._parts()
+        frames = [pd.read_parquet(path) for path in ([base] if base else []) + parts]
+        _write_parquet(pd.concat(frames, ignore_index=True),
+                       os.path.join(self.dir, f"base-{_number(parts[-1])}.parquet"))
+        for path in self._parts(stale=True):
+            os.remove(path)
+
+    def _compact_in_background(self):
+        try:
+            self.compact(blocking=False)
+        except Exception:
+            # Segments stay in place and are picked up by the next compaction
+            metrics.incr("responses.compact_failures")
+            log.exception("Compacting the response log in %s failed", self.dir)
+
+    def _import_legacy_excel(self):
+        # The first time the log is used, carry over the old read-modify-write
+        # workbook. The marker is written even when there is none, so a file
+        # that shows up there later (an export) is never imported on top
+        marker = os.path.join(self.dir, ".legacy-imported")
+        if os.path.exists(marker):
+            return
+        with _file_lock(self._compact_lock):
+            if os.path.exists(marker):
+                return
+            legacy = os.path.join(self.root, LEGACY_EXCEL)
+            # A log that already holds rows was started before the marker
+            # existed, so a workbook next to it can only be an export of it
+            if os.path.exists(legacy) and not self._has_rows():
+                df = pd.read_excel(legacy)
+                if len(df):
+                    _write_parquet(df, os.path.join(self.dir, "part-0.parquet"))
+            open(marker, "w").close()
+
+    def _has_rows(self):
+        current = os.path.exists(self._current) and os.path.getsize(self._current) > 0
+        return bool(current or self._base() or self._parts() or self._segments())
+
+    # -------------------- reading --------------------
+    def read(self):
+        """Every logged response as one DataFrame, oldest first."""
+        with _file_lock(self._compact_lock, shared=True):
+            base = self._base()
+            frames = [pd.read_parquet(path) for path in ([base] if base else []) + self._parts()]
+            # Hold off sealing while listing segments, so no rows move between
+            # current.jsonl and a segment unseen; sealed segments never change
+            with self._thread_lock, _file_lock(self._write_lock):
+                segments = self._segments()
+                current = _read_jsonl(self._current) if os.path.exists(self._current) else []
+            rows = [row for path in segments for row in _read_jsonl(path)] + current
+        if rows:
+            frames.append(pd.DataFrame.from_records(rows))
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames, ignore_index=True)
+
+    def export_excel(self, path=EXPORT_FILE):
+        df = self.read()
+        tmp = path + ".tmp.xlsx"
+        df.to_excel(tmp, index=False)
+        os.replace(tmp, path)
+        return len(df)
+
+
+def _write_parquet(df, path):
+    tmp = path + ".tmp"
+    df.to_parquet(tmp, index=False)
+    os.replace(tmp, path)
+
+
+def _json_default(value):
+    # numpy scalars (pandas values) -> Python values
+    if hasattr(value, "item"):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _number(path):
+    # segment-<ns>.jsonl / part-<ns>.parquet / base-<ns>.parquet -> ns
+    return int(os.path.basename(path).split("-", 1)[1].split(".", 1)[0])
+
+
+_log = None
+_log_lock = threading.Lock()
+
+
+def get_response_log():
+    """The process-wide response log, created on first use."""
+    global _log
+    if _log is None:
+        with _log_lock:
+            if _log is None:
+                _log = ResponseLog()
+    return _log
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compact or export the quiz response log.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    export = sub.add_parser("export", help="write every response to an Excel workbook")
+    export.add_argument("--output", default=EXPORT_FILE)
+    sub.add_parser("compact", help="merge logged segments into a Parquet part")
+    args = parser.parse_args(argv)
+
+    log = get_response_log()
+    if args.command == "export":
+        rows = log.export_excel(args.output)
+        print(f"💾 {rows} responses written to {args.output}")
+    else:
+        rows = log.compact(seal=True)
+        print(f"🗜  {rows} responses compacted into {log.dir}")
+
+
+if __name__ == "__main__":
+    main()
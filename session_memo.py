@@ -0,0 +1,54 @@
+import os
+import threading
+from array import array
+
+import metrics
+from session_model import ArtifactStore
+
+# ------------------------------------------------------------
+# Memoized results and charts per answer vector
+# ------------------------------------------------------------
+# A results page reruns on every click (chart hover, navigation, buttons)
+# while the answers behind it stay the same. Each named value is stored in a
+# process-wide LRU under the exact answers it was computed from, so it is
+# only recomputed when the answers change. Results depend on nothing but the
+# answers, so sessions with identical answers share one copy and a session
+# itself holds no cached objects. The LRU is separate from the session
+# ArtifactStore, so memo churn never evicts anyone's marksheet.
+
+MEMO_ITEMS = int(os.environ.get("SKILLBOT_MEMO_ITEMS", "2048"))
+
+_MEMO = "memo"
+_MISSING = object()
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_memo_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = ArtifactStore(MEMO_ITEMS)
+    return _store
+
+
+def _answers_key(answers):
+    # Option codes (a session's array('b')) key by their bytes, labels by tuple
+    return answers.tobytes() if isinstance(answers, array) else tuple(answers)
+
+
+def memoized(name, answers, compute):
+    """compute(answers), reused while the answers are unchanged."""
+    store = get_memo_store()
+    # The full answers are part of the key, so a hash collision can never serve stale results
+    ref = (_MEMO, name, _answers_key(answers))
+    value = store.get(ref, _MISSING)
+    if value is not _MISSING:
+        metrics.record_cache(f"results.{name}", True)
+        return value
+    metrics.record_cache(f"results.{name}", False)
+    value = compute(answers)
+    store.put(value, ref)
+    return value
@@ -0,0 +1,127 @@
+import os
+import sys
+import threading
+import uuid
+from array import array
+from collections import OrderedDict
+from dataclasses import dataclass, field, fields
+
+import metrics
+
+# ------------------------------------------------------------
+# Compact per-session state
+# ------------------------------------------------------------
+# Each Streamlit session keeps one SessionModel: answers are option codes in
+# an array('b') (one byte per question), scores are array('d') in the question
+# bank's category order, and the logged-in user is just an id and an email.
+# Anything large (OCR tables) lives in the shared ArtifactStore and the
+# session only holds its key. Memoized results and figures have their own
+# store (session_memo.py), so a burst of chart reruns can never evict a
+# session's marksheet.
+
+ARTIFACT_ITEMS = int(os.environ.get("SKILLBOT_ARTIFACT_ITEMS", "2048"))
+SESSION_KEY = "session"
+
+
+class ArtifactStore:
+    """Process-wide LRU of large artifacts, referenced from sessions by key."""
+
+    def __init__(self, max_items=ARTIFACT_ITEMS):
+        self.max_items = max_items
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def put(self, value, ref=None):
+        ref = uuid.uuid4().hex if ref is None else ref
+        with self._lock:
+            self._items[ref] = value
+            self._items.move_to_end(ref)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+                self._evictions += 1
+        return ref
+
+    def get(self, ref, default=None):
+        with self._lock:
+            try:
+                value = self._items[ref]
+            except KeyError:
+                self._misses += 1
+                return default
+            self._items.move_to_end(ref)
+            self._hits += 1
+            return value
+
+    def discard(self, ref):
+        with self._lock:
+            self._items.pop(ref, None)
+
+    def stats(self):
+        with self._lock:
+            return {"items": len(self._items), "max_items": self.max_items, "hits": self._hits,
+                    "misses": self._misses, "evictions": self._evictions}
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_artifact_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = ArtifactStore()
+    return _store
+
+
+@dataclass(slots=True)
+class SessionModel:
+    page: str = "intro"
+    index: int = 0
+    answers: array = field(default_factory=lambda: array("b"))      # RIASEC option codes
+    tci_page: str = "intro"
+    tci_index: int = 0
+    tci_answers: array = field(default_factory=lambda: array("b"))  # TCI option codes
+    riasec_scores: array | None = None  # array('d'), one value per RIASEC category
+    tci_scores: array | None = None     # array('d'), one value per TCI trait
+    sidebar_choice: str = "Home"
+    user_id: str | None = None
+    user_email: str | None = None
+    access_token: str | None = None
+    marksheet_ref: str | None = None    # key of the parsed marksheet in the ArtifactStore
+    ocr_job_id: str | None = None
+    notice: tuple | None = None         # (st method, text) from a background step, shown once
+
+    def memory_bytes(self):
+        """Approximate bytes held by this session (shared artifacts not included)."""
+        total = sys.getsizeof(self)
+        for f in fields(self):
+            value = getattr(self, f.name)
+            if value is not None:
+                total += sys.getsizeof(value)
+        return total
+
+
+def get_session(state=None):
+    """The SessionModel for the current Streamlit session, created on first use."""
+    if state is None:
+        import streamlit as st
+        state = st.session_state
+    session = state.get(SESSION_KEY)
+    if session is None:
+        session = state[SESSION_KEY] = SessionModel()
+    # Once per script run, i.e. after every update the previous run made
+    metrics.observe("session.memory_bytes", session.memory_bytes())
+    return session
+
+
+def reset_session(state=None):
+    if state is None:
+        import streamlit as st
+        state = st.session_state
+    state[SESSION_KEY] = SessionModel()
+    return state[SESSION_KEY]
@@ -0,0 +1,139 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+# ------------------------------------------------------------
+# Startup profile per page
+# ------------------------------------------------------------
+# Each page is rendered cold in its own interpreter (streamlit's AppTest,
+# under `python -X importtime`), so the numbers are what a fresh server
+# process pays on first paint. Only imports made while the page script runs
+# are counted; streamlit's own imports happen before the run starts.
+#
+#   python startup_profile.py                      # table, exit 1 if over budget
+#   python startup_profile.py --json profile.json  # also save the full report
+#
+# Budgets live in startup_budget.json: a max first-paint time per page, and
+# modules no page may import just to render (they belong behind a click).
+
+BUDGET_FILE = "startup_budget.json"
+PAGES = ["Home", "RIASEC Test", "TCI Test", "Dashboard", "Sign Up / Login", "Profile Creation"]
+TOP_IMPORTS = 8
+
+_MARKER = "startup_profile: page run starts"
+_CHILD = r"""
+import json, sys, time
+from streamlit.testing.v1 import AppTest
+app, page, marker = sys.argv[1:4]
+at = AppTest.from_file(app, default_timeout=300)
+# The app picks the page from the session model (session_model.py); import it
+# from the app's directory the way the page script will
+sys.path.insert(0, ".")
+from session_model import SESSION_KEY, SessionModel
+at.session_state[SESSION_KEY] = SessionModel(sidebar_choice=page)
+before = set(sys.modules)
+sys.stderr.write(marker + "\n")
+sys.stderr.flush()
+start = time.perf_counter()
+at.run()
+seconds = time.perf_counter() - start
+print(json.dumps({
+    "seconds": seconds,
+    "errors": [str(e.value) for e in at.exception],
+    "shown": at.sidebar.radio[0].value if len(at.sidebar.radio) else None,
+    "title": at.title[0].value if len(at.title) else None,
+    "new_modules": sorted(set(sys.modules) - before),
+}))
+"""
+
+
+def parse_importtime(stderr, marker=_MARKER):
+    """Top-level imports after the marker as {module: cumulative ms}."""
+    imports = {}
+    seen_marker = False
+    for line in stderr.splitlines():
+        if line == marker:
+            seen_marker = True
+            continue
+        if not seen_marker or not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|", 2)
+        # Nested imports are indented under the module that triggered them
+        if name.startswith("  ") or not cumulative.strip().isdigit():
+            continue
+        imports[name.strip()] = imports.get(name.strip(), 0) + int(cumulative) / 1000
+    return imports
+
+
+def profile_page(app, page):
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _CHILD, app, page, _MARKER],
+        capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(app)) or None,
+    )
+    if proc.returncode != 0:
+        return {"page": page, "seconds": None, "errors": [proc.stderr.strip().splitlines()[-1:]],
+                "imports_ms": {}, "new_modules": []}
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    result["page"] = page
+    result["imports_ms"] = parse_importtime(proc.stderr)
+    return result
+
+
+def check(result, budget):
+    """List of budget violations for one page."""
+    problems = []
+    limit = budget.get("pages", {}).get(result["page"], budget.get("default_seconds"))
+    if result["seconds"] is None:
+        problems.append("page failed to render")
+    elif result.get("shown") != result["page"]:
+        # Timing some other page would make every number meaningless
+        problems.append(f"rendered {result.get('shown')!r} instead")
+    elif limit is not None and result["seconds"] > limit:
+        problems.append(f"{result['seconds']:.2f}s > {limit:.2f}s budget")
+    if result["errors"]:
+        problems.append(f"exception: {result['errors'][0]}")
+    forbidden = set(budget.get("forbidden_imports", []))
+    loaded = sorted({m.split(".")[0] for m in result["new_modules"]} & forbidden)
+    if loaded:
+        problems.append("imports " + ", ".join(loaded))
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Per-page cold start profile for a Streamlit app.")
+    parser.add_argument("--app", default="app.py")
+    parser.add_argument("--budget", default=BUDGET_FILE)
+    parser.add_argument("--pages", nargs="+", default=PAGES)
+    parser.add_argument("--json", help="write the full report here")
+    args = parser.parse_args(argv)
+
+    with open(args.budget, encoding="utf-8") as f:
+        budget = json.load(f)
+
+    report, failed = [], 0
+    for page in args.pages:
+        result = profile_page(args.app, page)
+        result["problems"] = check(result, budget)
+        report.append(result)
+        failed += bool(result["problems"])
+
+        seconds = "failed" if result["seconds"] is None else f"{result['seconds'] * 1000:.0f} ms"
+        status = "OK" if not result["problems"] else "OVER BUDGET: " + "; ".join(result["problems"])
+        print(f"{page:<18} {seconds:>9}  {status}")
+        if result.get("title"):
+            print(f"    title: {result['title']}")
+        top = sorted(result["imports_ms"].items(), key=lambda kv: kv[1], reverse=True)[:TOP_IMPORTS]
+        for module, ms in top:
+            print(f"    {ms:8.1f} ms  {module}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    print(f"\n{len(report) - failed}/{len(report)} pages within budget")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
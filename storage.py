@@ -0,0 +1,250 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# ------------------------------------------------------------
+# Storage repository
+# ------------------------------------------------------------
+# Every app saves profiles and test results through a Repository, so a node
+# can run fully local on skillbot.db (no network hop, sub-millisecond writes)
+# or against the Supabase tables. SKILLBOT_STORAGE ("sqlite" / "supabase")
+# picks the backend; without it each app keeps its historical default.
+
+STORAGE = os.environ.get("SKILLBOT_STORAGE")
+DB_PATH = os.environ.get("SKILLBOT_DB", "skillbot.db")
+BUSY_TIMEOUT = float(os.environ.get("SKILLBOT_DB_BUSY_TIMEOUT", "5"))
+
+
+class StorageError(RuntimeError):
+    """Raised when a repository cannot save or load data."""
+
+
+class Repository:
+    """
+    Profiles are keyed by user id (a Supabase user id, or the username in the
+    local apps). Test results are stored per test type as a score dict.
+    """
+    name = "base"
+
+    def save_profile(self, user_id, name, gender, age, qualification, marksheet_url):
+        raise NotImplementedError
+
+    def get_profile(self, user_id):
+        """The profile dict for user_id, or None."""
+        raise NotImplementedError
+
+    def save_test_results(self, user_id, riasec, tci):
+        """Store RIASEC and TCI scores (Series from personality_scoring)."""
+        raise NotImplementedError
+
+
+def _scores(series):
+    # numpy scalars -> Python numbers, NaN -> None (JSON has no NaN)
+    out = {}
+    for key, value in series.items():
+        value = value.item() if hasattr(value, "item") else value
+        out[str(key)] = None if isinstance(value, float) and value != value else value
+    return out
+
+
+# ------------------------------------------------------------
+# SQLite backend
+# ------------------------------------------------------------
+# Schema changes, applied in order and tracked with PRAGMA user_version. The
+# original tables had no owner column on profiles and no indexes at all.
+MIGRATIONS = [
+    [
+        "ALTER TABLE profiles ADD COLUMN user_id TEXT",
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_profiles_user_id ON profiles(user_id)",
+        "CREATE INDEX IF NOT EXISTS idx_results_user_time ON results(user_name, timestamp)",
+        "CREATE INDEX IF NOT EXISTS idx_results_time ON results(timestamp)",
+    ],
+    # Local accounts (user_store.py)
+    [
+        """CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            email TEXT NOT NULL,
+            password_hash TEXT NOT NULL,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )""",
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_users_email ON users(email)",
+    ],
+    # Login throttling state shared by the processes of a node (rate_limit.py)
+    [
+        "CREATE TABLE IF NOT EXISTS rate_buckets (key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)",
+        "CREATE TABLE IF NOT EXISTS rate_events (key TEXT NOT NULL, at REAL NOT NULL)",
+        "CREATE INDEX IF NOT EXISTS idx_rate_events_key_at ON rate_events(key, at)",
+    ],
+]
+
+# Tables as they exist in the shipped skillbot.db, for a fresh database
+BASE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS profiles (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT,
+    age INTEGER,
+    gender TEXT,
+    education TEXT,
+    school TEXT,
+    marksheet_filename TEXT
+);
+CREATE TABLE IF NOT EXISTS results (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_name TEXT,
+    test_type TEXT,
+    result_data TEXT,
+    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+"""
+
+# Fixed SQL text, so sqlite3's per-connection statement cache reuses the
+# prepared statements
+UPSERT_PROFILE = """
+INSERT INTO profiles (user_id, name, gender, age, education, marksheet_filename)
+VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT(user_id) DO UPDATE SET
+    name = excluded.name, gender = excluded.gender, age = excluded.age,
+    education = excluded.education, marksheet_filename = excluded.marksheet_filename
+"""
+SELECT_PROFILE = """
+SELECT user_id, name, gender, age, education, marksheet_filename FROM profiles WHERE user_id = ?
+"""
+INSERT_RESULT = "INSERT INTO results (user_name, test_type, result_data, timestamp) VALUES (?, ?, ?, ?)"
+
+
+class SQLiteRepository(Repository):
+    name = "sqlite"
+
+    def __init__(self, path=DB_PATH, busy_timeout=BUSY_TIMEOUT):
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+        self._migrate()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=self.busy_timeout, cached_statements=64)
+        conn.row_factory = sqlite3.Row
+        # WAL lets readers run alongside the single writer; NORMAL sync is
+        # durable across application crashes and much cheaper than FULL
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    @property
+    def connection(self):
+        """This thread's connection, opened on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    def _migrate(self):
+        conn = self.connection
+        with conn:
+            conn.executescript(BASE_SCHEMA)
+        while conn.execute("PRAGMA user_version").fetchone()[0] < len(MIGRATIONS):
+            # BEGIN IMMEDIATE takes the write lock before the version is re-read,
+            # so two processes starting together apply each step once
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                version = conn.execute("PRAGMA user_version").fetchone()[0]
+                if version < len(MIGRATIONS):
+                    for statement in MIGRATIONS[version]:
+                        conn.execute(statement)
+                    conn.execute(f"PRAGMA user_version = {version + 1}")
+            except BaseException:
+                conn.rollback()
+                raise
+            conn.commit()
+
+    def _write(self, sql, params, many=False):
+        try:
+            with self.connection as conn:
+                (conn.executemany if many else conn.execute)(sql, params)
+        except sqlite3.Error as e:
+            raise StorageError(f"{type(e).__name__}: {e}") from e
+
+    def save_profile(self, user_id, name, gender, age, qualification, marksheet_url):
+        self._write(UPSERT_PROFILE, (user_id, name, gender, age, qualification, marksheet_url))
+
+    def get_profile(self, user_id):
+        row = self.connection.execute(SELECT_PROFILE, (user_id,)).fetchone()
+        if row is None:
+            return None
+        profile = dict(row)
+        profile["qualification"] = profile.pop("education")
+        profile["marksheet_url"] = profile.pop("marksheet_filename")
+        return profile
+
+    def save_test_results(self, user_id, riasec, tci):
+        now = time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime())
+        self._write(INSERT_RESULT, [
+            (user_id, "RIASEC", json.dumps(_scores(riasec)), now),
+            (user_id, "TCI", json.dumps(_scores(tci)), now),
+        ], many=True)
+
+    def close(self):
+        """Close this thread's connection."""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+# ------------------------------------------------------------
+# Supabase backend
+# ------------------------------------------------------------
+class SupabaseRepository(Repository):
+    """profiles / test_results tables; writes go through the write-behind buffer."""
+    name = "supabase"
+
+    def save_profile(self, user_id, name, gender, age, qualification, marksheet_url):
+        from persistence import WriteBufferFull, queue_profile
+        try:
+            queue_profile(user_id, name, gender, age, qualification, marksheet_url)
+        except WriteBufferFull as e:
+            raise StorageError("the server is busy, please try again shortly") from e
+
+    def get_profile(self, user_id):
+        from persistence import get_client
+        try:
+            rows = get_client().table("profiles").select("*").eq("user_id", user_id).limit(1).execute().data
+        except Exception as e:
+            raise StorageError(f"{type(e).__name__}: {e}") from e
+        if not rows:
+            return None
+        row = rows[0]
+        return {"user_id": row.get("user_id"), "name": row.get("full_name"), "gender": row.get("gender"),
+                "age": row.get("age"), "qualification": row.get("qualification"),
+                "marksheet_url": row.get("marksheet_url")}
+
+    def save_test_results(self, user_id, riasec, tci):
+        from persistence import WriteBufferFull, queue_test_results
+        try:
+            queue_test_results(user_id, riasec, tci)
+        except WriteBufferFull as e:
+            raise StorageError("the server is busy, please try again shortly") from e
+
+
+BACKENDS = {"sqlite": SQLiteRepository, "supabase": SupabaseRepository}
+
+_repositories = {}
+_repositories_lock = threading.Lock()
+
+
+def get_repository(default="sqlite"):
+    """The process-wide repository for SKILLBOT_STORAGE, or `default` if unset."""
+    backend = (STORAGE or default).lower()
+    repo = _repositories.get(backend)
+    if repo is None:
+        with _repositories_lock:
+            repo = _repositories.get(backend)
+            if repo is None:
+                try:
+                    cls = BACKENDS[backend]
+                except KeyError:
+                    raise ValueError(f"Unknown storage backend {backend!r}; choose from {sorted(BACKENDS)}") from None
+                repo = _repositories[backend] = cls()
+    return repo
@@ -1,8 +1,9 @@
 import streamlit as st
-import pandas as pd
 import matplotlib.pyplot as plt
 import auth
-import os
+from question_bank import get_riasec_bank, get_career_bank
+from personality_scoring import LIKE_SCALE, score_riasec
+from response_log import get_response_log
 
 # -------------------- PAGE SETUP --------------------
 st.set_page_config(page_title="SkillBot Interest Profiler", layout="centered")
@@ -77,9 +78,9 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
-# -------------------- RESPONSES FILE SETUP --------------------
-RESPONSES_FILE = "responses/responses.xlsx"
-os.makedirs("responses", exist_ok=True)
+# -------------------- RESPONSES LOG --------------------
+# Submissions are appended to responses/log (see response_log.py);
+# `python response_log.py export` writes responses/responses-export.xlsx on demand
 
 # -------------------- SESSION --------------------
 if "logged_in" not in st.session_state:
@@ -150,14 +151,15 @@ elif st.session_state.get("show_login", False):
             st.error("Invalid credentials")
 
 # -------------------- LOAD DATA --------------------
-questions = pd.read_csv("questions.csv")
-careers = pd.read_csv("careers.csv")
+questions = get_riasec_bank()
+careers = get_career_bank()
 
 # -------------------- FUNCTIONS --------------------
 def restart():
     st.session_state.page = "intro"
     st.session_state.index = 0
     st.session_state.answers = []
+    st.session_state.responses_saved = False
 
 def next_question(selected):
     st.session_state.answers.append(selected)
@@ -167,18 +169,13 @@ def next_question(selected):
     st.experimental_rerun()
 
 def save_responses():
-    df = questions.copy()
-    df["answer"] = st.session_state.answers
-    df["username"] = st.session_state.get("username")
-    df["email"] = st.session_state.get("email")
-
-    if os.path.exists(RESPONSES_FILE):
-        existing = pd.read_excel(RESPONSES_FILE)
-        df_to_save = pd.concat([existing, df], ignore_index=True)
-    else:
-        df_to_save = df
-
-    df_to_save.to_excel(RESPONSES_FILE, index=False)
+    # Logged once per completed test, however often the results page reruns
+    if not st.session_state.get("responses_saved"):
+        df = questions.to_frame()
+        df["answer"] = st.session_state.answers
+        get_response_log().append(df, username=st.session_state.get("username"),
+                                  email=st.session_state.get("email"))
+        st.session_state.responses_saved = True
     st.success("Your responses have been saved successfully!")
 
 # -------------------- INTRO PAGE --------------------
@@ -195,9 +192,9 @@ if st.session_state.page == "intro":
 # -------------------- QUIZ PAGE --------------------
 elif st.session_state.page == "quiz":
     q_idx = st.session_state.index
-    q = questions.iloc[q_idx]
+    q = questions.question(q_idx)
 
-    st.markdown(f"<div class='question-box'><h3>Question {q_idx + 1} of {len(questions)}</h3><p>{q['question']}</p></div>", unsafe_allow_html=True)
+    st.markdown(f"<div class='question-box'><h3>Question {q_idx + 1} of {len(questions)}</h3><p>{q}</p></div>", unsafe_allow_html=True)
 
     options = {
         "Strongly Dislike": "😠",
@@ -215,11 +212,7 @@ elif st.session_state.page == "quiz":
 # -------------------- RESULTS PAGE --------------------
 elif st.session_state.page == "results":
     st.title("🎯 Your Interest Profile")
-    df = questions.copy()
-    df["answer"] = st.session_state.answers
-    rating_map = {"Strongly Dislike": 1, "Dislike": 2, "Unsure": 3, "Like": 4, "Strongly Like": 5}
-    df["score"] = df["answer"].map(rating_map)
-    riasec_scores = df.groupby("category")["score"].mean().sort_values(ascending=False)
+    riasec_scores = score_riasec(st.session_state.answers, LIKE_SCALE)
     top = riasec_scores.head(3).index.tolist()
     save_responses()
 
@@ -247,9 +240,9 @@ elif st.session_state.page == "careers":
         st.warning("Please complete the test first.")
     else:
         for cat in top_interests:
-            row = careers[careers["category"] == cat]
-            if not row.empty:
-                st.markdown(f"### {cat} — {row.iloc[0]['careers']}")
+            names = careers.careers(cat)
+            if names:
+                st.markdown(f"### {cat} — {', '.join(names)}")
     if st.button("🏠 Back to Start"):
         restart()
         st.experimental_rerun()
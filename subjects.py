@@ -0,0 +1,203 @@
+import re
+from collections import defaultdict
+from functools import lru_cache
+
+import pandas as pd
+
+# ------------------------------------------------------------
+# Subject canonicalization
+# ------------------------------------------------------------
+# Every alias of every subject is compiled into one case-insensitive
+# alternation, so an OCR'd subject line is mapped to its canonical key with a
+# single regex pass instead of one str.contains scan per keyword.
+
+# canonical key -> aliases (substrings that identify the subject on a marksheet)
+SUBJECT_ALIASES = {
+    "math": ["MATHEMATICS", "MATH"],
+    "physics": ["PHYSICS"],
+    "chemistry": ["CHEMISTRY"],
+    "biology": ["BIOLOGY"],
+    "computer": ["COMPUTER"],
+    "english": ["ENGLISH"],
+    "urdu": ["URDU"],
+    "islamiat": ["ISLAMIYAT", "ISLAM"],
+    "pakstudies": ["PAKISTAN"],
+}
+
+# canonical key -> name as printed on marksheets (used when repairing OCR text)
+SUBJECT_NAMES = {
+    "math": "MATHEMATICS",
+    "physics": "PHYSICS",
+    "chemistry": "CHEMISTRY",
+    "biology": "BIOLOGY",
+    "computer": "COMPUTER SCIENCE",
+    "english": "ENGLISH",
+    "urdu": "URDU",
+    "islamiat": "ISLAMIYAT",
+    "pakstudies": "PAKISTAN STUDIES",
+}
+
+_ALIAS_TO_KEY = {alias: key for key, aliases in SUBJECT_ALIASES.items() for alias in aliases}
+# Longest aliases first so "MATHEMATICS" wins over "MATH" at the same position
+SUBJECT_PATTERN = re.compile(
+    "|".join(re.escape(a) for a in sorted(_ALIAS_TO_KEY, key=len, reverse=True)),
+    re.IGNORECASE,
+)
+
+
+# ------------------------------------------------------------
+# Fuzzy matching for noisy OCR tokens
+# ------------------------------------------------------------
+# OCR turns "MATHEMATICS" into "MATHEMATlCS" or "CHEMISTRY" into "CHEMISTY".
+# Aliases are indexed by character trigram; a token is
+# scored against every candidate sharing a trigram with it (Dice
+# coefficient), so each lookup only touches a handful of entries. Trigrams
+# alone can't tell a typo from a different subject with the same ending
+# (SOCIOLOGY vs BIOLOGY scores 0.625), so a candidate is only accepted within
+# a few character edits of the alias: about one per four letters.
+
+FUZZY_MIN_SCORE = 0.6
+_MIN_FUZZY_LEN = 4
+# Words that may sit next to a subject name without making the line another
+# subject, as in "ENGLISH (COMPULSORY)"
+QUALIFIER_WORDS = {"COMPULSORY", "ELECTIVE", "OPTIONAL", "PAPER", "PART", "THEORY", "PRACTICAL"}
+# Common OCR digit/symbol confusions inside words
+_OCR_CONFUSIONS = str.maketrans({"0": "O", "1": "I", "5": "S", "8": "B", "|": "I", "$": "S"})
+
+
+def _normalize(text):
+    text = str(text).upper().translate(_OCR_CONFUSIONS)
+    return re.sub(r"[^A-Z ]+", "", text).strip()
+
+
+def _trigrams(word):
+    padded = f" {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _max_edits(term):
+    return max(1, len(term) // 4)
+
+
+def _within_edits(a, b, limit):
+    """True if the Levenshtein distance between a and b is at most limit."""
+    if abs(len(a) - len(b)) > limit:
+        return False
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        if min(current) > limit:
+            return False
+        previous = current
+    return previous[-1] <= limit
+
+
+class FuzzySubjectIndex:
+    def __init__(self, aliases=SUBJECT_ALIASES, names=SUBJECT_NAMES):
+        self._entries = []                  # (key, term, number of trigrams)
+        self._postings = defaultdict(list)  # trigram -> entry ids
+        # Words a subject line may be made of besides the aliases ("SCIENCE", "STUDIES")
+        self._companions = QUALIFIER_WORDS | {w for name in names.values() for w in _normalize(name).split()}
+        for key in aliases:
+            for term in {_normalize(a) for a in aliases[key]}:
+                if len(term) < _MIN_FUZZY_LEN:
+                    continue
+                grams = _trigrams(term)
+                for g in grams:
+                    self._postings[g].append(len(self._entries))
+                self._entries.append((key, term, len(grams)))
+
+    def _best(self, word):
+        grams = _trigrams(word)
+        shared = defaultdict(int)
+        for g in grams:
+            for entry in self._postings.get(g, ()):
+                shared[entry] += 1
+        scored = []
+        for entry, count in shared.items():
+            key, term, size = self._entries[entry]
+            scored.append((2 * count / (len(grams) + size), key, term))
+        # Highest Dice score first, but only a plausible misspelling counts
+        for score, key, term in sorted(scored, key=lambda s: s[0], reverse=True):
+            if _within_edits(word, term, _max_edits(term)):
+                return key, score
+        return None, 0.0
+
+    def match(self, token, min_score=FUZZY_MIN_SCORE):
+        """Return (canonical key, confidence 0-1) for a noisy token, or (None, score under min_score)."""
+        text = _normalize(token)
+        best_key, best_score = self._best(text) if len(text) >= _MIN_FUZZY_LEN else (None, 0.0)
+        words = [w for w in text.split() if len(w) >= _MIN_FUZZY_LEN]
+        if best_score < min_score and len(words) > 1:
+            # Then the best single word, so "ENGLSH (COMPULSORY)" still resolves,
+            # but only if every word belongs to a subject name: one close word
+            # must not turn "PHYSICAL EDUCATION" into physics
+            scored = [(w, *self._best(w)) for w in words]
+            if all(score >= min_score or w in self._companions for w, _, score in scored):
+                for w, key, score in scored:
+                    if w not in QUALIFIER_WORDS and score > best_score:
+                        best_key, best_score = key, score
+        return (best_key, best_score) if best_score >= min_score else (None, best_score)
+
+
+_fuzzy_index = FuzzySubjectIndex()
+
+
+@lru_cache(maxsize=65536)
+def match_subject(token, min_score=FUZZY_MIN_SCORE):
+    """Exact alias match (confidence 1.0) first, then the trigram index."""
+    match = SUBJECT_PATTERN.search(str(token))
+    if match:
+        return _ALIAS_TO_KEY[match.group(0).upper()], 1.0
+    return _fuzzy_index.match(token, min_score)
+
+
+def canonical_subject(text, fuzzy=True):
+    """Return the canonical key for one subject line, or None."""
+    if fuzzy:
+        return match_subject(str(text))[0]
+    match = SUBJECT_PATTERN.search(str(text))
+    return _ALIAS_TO_KEY[match.group(0).upper()] if match else None
+
+
+def canonicalize(subjects, fuzzy=True):
+    """Vectorized canonical_subject over a Series of subject lines."""
+    return _canonicalize(subjects, fuzzy)[0]
+
+
+def _canonicalize(subjects, fuzzy=True):
+    # (keys, exact): exact is True where an alias appears verbatim in the line
+    subjects = subjects.astype(str)
+    found = subjects.str.extract(f"({SUBJECT_PATTERN.pattern})", flags=re.IGNORECASE)[0]
+    keys = found.str.upper().map(_ALIAS_TO_KEY)
+    exact = keys.notna()
+    if fuzzy:
+        # Only lines the exact pattern missed go through the fuzzy index
+        keys[~exact] = subjects[~exact].map(lambda s: match_subject(s)[0])
+    return keys, exact
+
+
+def subject_scores(df, id_col=None, subject_col="subject", marks_col="marks"):
+    """
+    Wide subject scores from a long marksheet table, in one pass.
+    With id_col, returns one row per student; otherwise a single-row frame.
+    A row naming the subject exactly wins over fuzzy matches (OCR typos), then
+    the first row mapping to a subject wins; unmatched subjects score 0.
+    """
+    keys = list(SUBJECT_ALIASES)
+    canonical, exact = _canonicalize(df[subject_col])
+    long = pd.DataFrame({
+        "id": df[id_col].to_numpy() if id_col else 0,
+        "key": canonical.to_numpy(),
+        "exact": exact.to_numpy(),
+        "marks": df[marks_col].to_numpy(),
+    }).dropna(subset=["key"])
+    long = long.sort_values("exact", ascending=False, kind="stable")
+    long = long.drop_duplicates(subset=["id", "key"], keep="first")
+    wide = long.pivot(index="id", columns="key", values="marks")
+    ids = pd.unique(df[id_col]) if id_col else [0]
+    wide = wide.reindex(index=ids, columns=keys).fillna(0).astype(int)
+    wide.columns.name = None
+    return wide
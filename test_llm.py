@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+
+from LLM import FIELDS, SUBJECT_KEYS, TRAIT_KEYS, calculate_best_fit, score_cohort
+
+
+def baseline_best_fit(marks, personality):
+    # calculate_best_fit as it was before field_weights.json, kept verbatim as the reference
+    scores = {"Medical": 0, "Engineering": 0, "Computer Science": 0, "Arts": 0, "Business": 0, "Commerce": 0}
+    scores["Medical"] += (marks["biology"]/150)*0.35 + (marks["chemistry"]/150)*0.35 + (marks["physics"]/150)*0.1 + (marks["math"]/150)*0.1 + (marks["english"]/150)*0.05 + (marks["urdu"]/150)*0.05
+    scores["Engineering"] += (marks["math"]/150)*0.35 + (marks["physics"]/150)*0.35 + (marks["chemistry"]/150)*0.1 + (marks["biology"]/150)*0.05 + (marks["english"]/150)*0.05 + (marks["urdu"]/150)*0.1
+    scores["Computer Science"] += (marks["math"]/150)*0.3 + (marks["physics"]/150)*0.2 + (marks["computer"]/150)*0.25 + (marks["english"]/150)*0.1 + (marks["biology"]/150)*0.05 + (marks["urdu"]/150)*0.1
+    scores["Arts"] += (marks["english"]/150)*0.4 + (marks["urdu"]/150)*0.3 + (marks["biology"]/150)*0.05 + (marks["chemistry"]/150)*0.05 + (marks["math"]/150)*0.1 + (marks["physics"]/150)*0.1
+    scores["Business"] += (marks["math"]/150)*0.2 + (marks["english"]/150)*0.3 + (marks["urdu"]/150)*0.2 + (marks["biology"]/150)*0.05 + (marks["chemistry"]/150)*0.05 + (marks["physics"]/150)*0.2
+    scores["Commerce"] += (marks["math"]/150)*0.3 + (marks["english"]/150)*0.25 + (marks["urdu"]/150)*0.2 + (marks["biology"]/150)*0.05 + (marks["chemistry"]/150)*0.05 + (marks["physics"]/150)*0.15
+    scores["Medical"] += ((personality.get("riasec_I",0) + personality.get("riasec_A",0))/10) * 0.3
+    scores["Engineering"] += ((personality.get("riasec_I",0) + personality.get("riasec_C",0))/10) * 0.3
+    scores["Computer Science"] += ((personality.get("riasec_C",0) + personality.get("tci_NoveltySeeking",0))/10) * 0.3
+    scores["Arts"] += ((personality.get("riasec_A",0) + personality.get("riasec_E",0))/10) * 0.3
+    scores["Business"] += ((personality.get("riasec_E",0) + personality.get("tci_RewardDependence",0))/10) * 0.3
+    scores["Commerce"] += ((personality.get("riasec_E",0) + personality.get("riasec_C",0))/10) * 0.3
+    total_score = sum(scores.values())
+    probabilities = {field: round(score/total_score, 3) for field, score in scores.items()}
+    return dict(sorted(probabilities.items(), key=lambda x: x[1], reverse=True))
+
+
+def cohort(n, seed=0):
+    rng = np.random.default_rng(seed)
+    marks = pd.DataFrame(rng.integers(30, 151, (n, len(SUBJECT_KEYS))), columns=SUBJECT_KEYS)
+    personality = pd.DataFrame(np.round(rng.uniform(0, 5, (n, len(TRAIT_KEYS))), 2), columns=TRAIT_KEYS)
+    return marks, personality
+
+
+def test_batch_matches_scalar():
+    marks, personality = cohort(5000)
+    batch = score_cohort(marks, personality)
+    # Every row must score the same whatever the size of the table it is in
+    chunks = pd.concat([score_cohort(marks.iloc[i:i + 7], personality.iloc[i:i + 7])
+                        for i in range(0, len(marks), 7)])
+    assert batch.equals(chunks)
+    # BLAS took a different path for one row than for many (matrix-vector vs
+    # matrix-matrix), so check every student on their own
+    for i in range(len(marks)):
+        alone = score_cohort(marks.iloc[[i]], personality.iloc[[i]])
+        assert batch.iloc[i].tolist() == alone.iloc[0].tolist(), f"student {i}"
+
+
+def test_matches_baseline_formula():
+    marks, personality = cohort(5000, seed=1)
+    batch = score_cohort(marks, personality)
+    for i, (m, p) in enumerate(zip(marks.to_dict("records"), personality.to_dict("records"))):
+        expected = baseline_best_fit(m, p)
+        assert dict(zip(FIELDS, batch.iloc[i].tolist())) == expected, f"student {i}"
+        if i < 300:
+            # Same values and the same order (ties keep FIELDS order in both)
+            assert list(calculate_best_fit(m, p).items()) == list(expected.items())
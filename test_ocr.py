@@ -0,0 +1,79 @@
+import cv2
+import numpy as np
+import pytest
+
+import ocr_cache
+import ocr_pool
+from LLM import clean_marksheet, extract_subject_scores
+from OCR import extract_marks_from_marksheet, parse_marks
+from ocr_backends import FakeBackend
+
+# One recorded marksheet, row by row: serial numbers, an OCR typo (kept as
+# read; scoring resolves it) and the TOTAL row with its numbers out of order,
+# as PaddleOCR returns them
+SHEET = [["BOARD OF INTERMEDIATE EDUCATION"],
+         ["SUBJECT - WISE STATEMENT OF MARKS"],
+         ["SR.NO.", "SUBJECTS", "MAXIMUM", "OBTAINED"],
+         ["1", "ENGLISH", "75", "61"],
+         ["2", "URDU", "75", "58"],
+         ["3", "CHEMISTY", "100", "87"],
+         ["4", "PHYSICS", "100", "79"],
+         ["TOTAL", "49", "350", "285"]]
+TOKENS = [text for row in SHEET for text in row]
+# Each token in its own cell: 100 px columns, 20 px rows
+BOXES = [[100 * col, 20 * row, 100 * col + 80, 20 * row + 15, 0.99]
+         for row, cells in enumerate(SHEET) for col in range(len(cells))]
+EXPECTED = [("ENGLISH", 75, 61), ("URDU", 75, 58), ("CHEMISTY", 100, 87), ("PHYSICS", 100, 79),
+            ("TOTAL", 350, 285)]
+
+
+@pytest.fixture
+def backend(tmp_path, monkeypatch):
+    fake = FakeBackend(pages=[{"text": TOKENS, "boxes": BOXES}])
+    monkeypatch.setattr(ocr_pool, "_pool", ocr_pool.OCREnginePool(size=1, factory=lambda **_: fake))
+    monkeypatch.setattr(ocr_cache, "_cache", ocr_cache.OCRCache(str(tmp_path / "cache")))
+    return fake
+
+
+@pytest.fixture
+def marksheet(tmp_path):
+    path = str(tmp_path / "marksheet.png")
+    img = np.full((400, 600, 3), 255, np.uint8)
+    cv2.putText(img, "MARKS", (50, 200), cv2.FONT_HERSHEY_SIMPLEX, 2, (0, 0, 0), 3)
+    cv2.imwrite(path, img)
+    return path
+
+
+def rows(df):
+    return list(df[["Subject", "Maximum", "Obtained"]].itertuples(index=False, name=None))
+
+
+def test_marks_are_parsed_from_tokens(backend, marksheet):
+    df = extract_marks_from_marksheet(marksheet, verbose=False)
+    assert rows(df) == EXPECTED
+
+
+def test_layout_parsing_reads_rows_from_boxes(backend, marksheet):
+    df = extract_marks_from_marksheet(marksheet, verbose=False, layout=True)
+    assert rows(df) == EXPECTED
+
+
+def test_second_run_is_served_from_the_cache(backend, marksheet, tmp_path):
+    first = extract_marks_from_marksheet(marksheet, verbose=False)
+    backend.pages = [{"text": ["NOTHING"], "boxes": None}]
+    second = extract_marks_from_marksheet(marksheet, output_csv=str(tmp_path / "marks.csv"), verbose=False)
+    assert rows(second) == rows(first)
+    assert (tmp_path / "marks.csv").exists()
+
+
+def test_a_different_subject_is_not_scored_as_a_close_one():
+    # SOCIOLOGY must neither be renamed BIOLOGY nor lend biology its marks
+    df = parse_marks(["SOCIOLOGY", "100", "77", "BIOLOGY", "100", "55"])
+    assert rows(df) == [("SOCIOLOGY", 100, 77), ("BIOLOGY", 100, 55)]
+    assert extract_subject_scores(clean_marksheet(df))["biology"] == 55
+
+
+def test_exact_subject_rows_win_over_typos():
+    # CHEMESTRY sorts first and would otherwise claim chemistry
+    df = parse_marks(["CHEMESTRY", "100", "40", "CHEMISTRY", "100", "87"])
+    assert extract_subject_scores(clean_marksheet(df))["chemistry"] == 87
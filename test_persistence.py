@@ -0,0 +1,96 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import persistence
+from persistence import RestClient, WriteBehindBuffer
+
+
+class StandIn(BaseHTTPRequestHandler):
+    """Answers PostgREST bulk writes like Supabase, failing the first `fail` requests with 503."""
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        server = self.server
+        with server.lock:
+            if server.fail:
+                server.fail -= 1
+                status = 503
+            else:
+                status = 201
+                server.requests.append((self.path, self.headers["Prefer"], self.headers["apikey"], body))
+        self.send_response(status)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), StandIn)
+    srv.lock, srv.fail, srv.requests = threading.Lock(), 0, []
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+
+
+@pytest.fixture
+def writer(server):
+    w = WriteBehindBuffer(RestClient(f"http://127.0.0.1:{server.server_port}", "test-key"),
+                          batch_rows=50, flush_seconds=5, backoff=0.01)
+    yield w
+    w.close()
+
+
+def test_inserts_are_batched(server, writer):
+    riasec = pd.Series([4.0, np.nan, 3, 2, 1, 5], index=list("RIASEC"))
+    tci = pd.Series(np.arange(7), index=list(persistence.TCI_COLUMNS))
+    for i in range(120):
+        writer.insert("test_results", persistence.test_results_row(f"u{i}", riasec, tci))
+    assert writer.flush(5)
+
+    # Batch boundaries depend on when the flusher wakes; none is over batch_rows
+    sizes = [len(body) for _, _, _, body in server.requests]
+    assert max(sizes) <= 50 and len(sizes) <= 5
+    ids = [row["user_id"] for _, _, _, body in server.requests for row in body]
+    assert sorted(ids) == sorted(f"u{i}" for i in range(120))
+    path, prefer, key, body = server.requests[0]
+    assert path == "/rest/v1/test_results"
+    assert prefer == "return=minimal"
+    assert key == "test-key"
+    assert body[0]["riasec_I"] is None and body[0]["tci_Persistence"] == 0
+
+
+def test_upserts_collapse_and_name_the_conflict_column(server, writer):
+    for i in range(30):
+        writer.upsert("profiles", {"user_id": f"u{i % 10}", "age": np.int64(i)}, key="user_id")
+    assert writer.flush(5)
+
+    [(path, prefer, _, body)] = server.requests
+    assert path == "/rest/v1/profiles?on_conflict=user_id"
+    assert prefer.startswith("resolution=merge-duplicates")
+    assert sorted(row["age"] for row in body) == list(range(20, 30))
+
+
+def test_retryable_errors_are_retried(server, writer):
+    server.fail = 2
+    writer.insert("test_results", {"user_id": "u1"})
+    assert writer.flush(5)
+    assert len(server.requests) == 1
+    assert writer.stats()["retries"] == 2
+    assert writer.stats()["rows_failed"] == 0
+
+
+def test_credentials_are_required(monkeypatch):
+    monkeypatch.setattr(persistence, "SUPABASE_URL", None)
+    monkeypatch.setattr(persistence, "SUPABASE_KEY", None)
+    with pytest.raises(RuntimeError, match="SUPABASE_URL"):
+        RestClient()
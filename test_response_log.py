@@ -0,0 +1,48 @@
+import os
+import shutil
+
+import pandas as pd
+
+from response_log import ResponseLog
+
+
+def test_parts_are_merged_into_a_base(tmp_path):
+    log = ResponseLog(root=str(tmp_path), segment_bytes=1, compact_segments=1000, merge_parts=3)
+    for i in range(10):
+        log.append([{"question": i, "answer": 1}], username="u")
+        log.compact()
+    names = os.listdir(log.dir)
+    assert sum(n.startswith("base-") for n in names) == 1
+    assert sum(n.startswith("part-") for n in names) < 3
+    assert log.read()["question"].tolist() == list(range(10))
+
+
+def test_leftovers_of_an_interrupted_merge_are_ignored(tmp_path):
+    log = ResponseLog(root=str(tmp_path), segment_bytes=1, compact_segments=1000, merge_parts=2)
+    log.append([{"question": 0, "answer": 1}])
+    log.compact()
+    part = next(os.path.join(log.dir, n) for n in os.listdir(log.dir) if n.startswith("part-"))
+    shutil.copy(part, part + ".keep")
+    log.append([{"question": 1, "answer": 1}])
+    log.compact()
+    # As if the merge crashed after writing the base but before removing the parts
+    os.replace(part + ".keep", part)
+    assert log.read()["question"].tolist() == [0, 1]
+    log.compact()
+    assert not os.path.exists(part)
+
+
+def test_exporting_does_not_duplicate_rows(tmp_path):
+    log = ResponseLog(root=str(tmp_path))
+    log.append([{"question": 0, "answer": 1}, {"question": 1, "answer": 2}])
+    log.export_excel(str(tmp_path / "responses-export.xlsx"))
+    # Older versions exported to the legacy workbook's path
+    log.export_excel(str(tmp_path / "responses.xlsx"))
+    assert len(ResponseLog(root=str(tmp_path)).read()) == 2
+
+
+def test_legacy_workbook_is_imported_once(tmp_path):
+    pd.DataFrame({"question": [0, 1], "answer": [3, 4]}).to_excel(tmp_path / "responses.xlsx", index=False)
+    log = ResponseLog(root=str(tmp_path))
+    log.append([{"question": 2, "answer": 5}])
+    assert ResponseLog(root=str(tmp_path)).read()["question"].tolist() == [0, 1, 2]
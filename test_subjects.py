@@ -0,0 +1,18 @@
+from subjects import match_subject
+
+
+def test_ocr_typos_resolve():
+    assert match_subject("CHEMISTY")[0] == "chemistry"
+    assert match_subject("ENGLSH (COMPULSORY)")[0] == "english"
+    assert match_subject("PAKISTN STUDIES")[0] == "pakstudies"
+
+
+def test_other_subjects_are_not_renamed():
+    # One word close to a subject must not claim a line about something else
+    assert match_subject("PHYSICAL EDUCATION")[0] is None
+    assert match_subject("HEALTH AND PHYSICAL EDUCATION")[0] is None
+    assert match_subject("GENERAL SCIENCE")[0] is None
+    # Same "-OLOGY" trigrams as BIOLOGY, but far more than a typo away
+    assert match_subject("SOCIOLOGY")[0] is None
+    assert match_subject("PHYSIOLOGY")[0] is None
+    assert match_subject("PHYSICAL")[0] is None
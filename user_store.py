@@ -0,0 +1,242 @@
+import argparse
+import base64
+import csv
+import hashlib
+import hmac
+import os
+import secrets
+import sqlite3
+import threading
+import time
+
+from storage import DB_PATH, SQLiteRepository
+
+# ------------------------------------------------------------
+# Local user accounts
+# ------------------------------------------------------------
+# auth.py used to read all of users.csv on every signup and login (and looked
+# for an "email" column the file doesn't have). Accounts now live in the users
+# table of skillbot.db behind a UNIQUE email index, so concurrent signups
+# can't create duplicates. Each process keeps an email -> (id, hash) dict,
+# loaded once and updated on every signup, so a login is one dict lookup plus
+# one password hash.
+#
+# Passwords are stored as salted scrypt hashes. The cost (N = 2**SCRYPT_LOG_N)
+# is tunable: `python user_store.py benchmark` times each cost on the target
+# machine and recommends one step below the largest that fits LOGIN_BUDGET_MS
+# (the default 2**14 takes ~70 ms on a typical server core). Hashes with an
+# older cost are upgraded transparently on the next successful login.
+
+USERS_CSV = "users.csv"
+SCRYPT_LOG_N = int(os.environ.get("SKILLBOT_SCRYPT_LOG_N", "14"))
+SCRYPT_R = int(os.environ.get("SKILLBOT_SCRYPT_R", "8"))
+SCRYPT_P = int(os.environ.get("SKILLBOT_SCRYPT_P", "1"))
+LOGIN_BUDGET_MS = float(os.environ.get("SKILLBOT_LOGIN_BUDGET_MS", "250"))
+
+SALT_BYTES = 16
+KEY_BYTES = 32
+
+
+def _b64(data):
+    return base64.b64encode(data).decode("ascii")
+
+
+def _scrypt(password, salt, log_n, r, p):
+    n = 1 << log_n
+    # OpenSSL's default 32 MiB cap is below what N=2**15 and up need
+    return hashlib.scrypt(password.encode("utf-8"), salt=salt, n=n, r=r, p=p,
+                          maxmem=256 * n * r + (1 << 20), dklen=KEY_BYTES)
+
+
+def hash_password(password, log_n=None, r=None, p=None):
+    """'scrypt$<log_n>$<r>$<p>$<salt>$<key>' with a fresh random salt."""
+    log_n = SCRYPT_LOG_N if log_n is None else log_n
+    r = SCRYPT_R if r is None else r
+    p = SCRYPT_P if p is None else p
+    salt = secrets.token_bytes(SALT_BYTES)
+    return f"scrypt${log_n}${r}${p}${_b64(salt)}${_b64(_scrypt(password, salt, log_n, r, p))}"
+
+
+def verify_password(password, stored):
+    """True if `password` matches the stored hash; compares in constant time."""
+    try:
+        scheme, log_n, r, p, salt, key = stored.split("$")
+        if scheme != "scrypt":
+            return False
+        candidate = _scrypt(password, base64.b64decode(salt), int(log_n), int(r), int(p))
+    except (ValueError, TypeError):
+        return False
+    return hmac.compare_digest(candidate, base64.b64decode(key))
+
+
+def needs_rehash(stored):
+    return not stored.startswith(f"scrypt${SCRYPT_LOG_N}${SCRYPT_R}${SCRYPT_P}$")
+
+
+_dummy = None
+
+
+def _dummy_hash():
+    # A real hash at the current cost, made once per process
+    global _dummy
+    if _dummy is None:
+        _dummy = hash_password(secrets.token_hex(16))
+    return _dummy
+
+
+def normalize_email(email):
+    return (email or "").strip().lower()
+
+
+class UserStore:
+    def __init__(self, path=DB_PATH, users_csv=USERS_CSV):
+        self._db = SQLiteRepository(path)
+        self._lock = threading.Lock()
+        if users_csv and os.path.exists(users_csv):
+            self._import_csv(users_csv)
+        # The in-memory index: email -> (id, password_hash)
+        rows = self._db.connection.execute("SELECT id, email, password_hash FROM users")
+        self._index = {email: (user_id, password_hash) for user_id, email, password_hash in rows}
+        _dummy_hash()  # made now, so the first unknown-email login isn't slower than the rest
+
+    def __len__(self):
+        return len(self._index)
+
+    def __contains__(self, email):
+        return self._lookup(normalize_email(email)) is not None
+
+    def _lookup(self, email):
+        entry = self._index.get(email)
+        if entry is None:
+            # Another process may have signed this user up since we loaded
+            row = self._db.connection.execute(
+                "SELECT id, password_hash FROM users WHERE email = ?", (email,)).fetchone()
+            if row is not None:
+                entry = (row[0], row[1])
+                with self._lock:
+                    self._index[email] = entry
+        return entry
+
+    def create(self, email, password):
+        """Add a user; False if the email is empty or already registered."""
+        email = normalize_email(email)
+        if not email or self._lookup(email) is not None:
+            return False
+        password_hash = hash_password(password)
+        try:
+            with self._db.connection as conn:
+                cursor = conn.execute("INSERT INTO users (email, password_hash) VALUES (?, ?)",
+                                      (email, password_hash))
+        except sqlite3.IntegrityError:
+            # Lost a race with a concurrent signup for the same email
+            return False
+        with self._lock:
+            self._index[email] = (cursor.lastrowid, password_hash)
+        return True
+
+    def authenticate(self, email, password):
+        """The user id if the password is right, else None."""
+        email = normalize_email(email)
+        entry = self._lookup(email)
+        if entry is None:
+            # Hash anyway, so an unknown email takes as long as a wrong password
+            verify_password(password, _dummy_hash())
+            return None
+        user_id, password_hash = entry
+        if not verify_password(password, password_hash):
+            return None
+        if needs_rehash(password_hash):
+            self._rehash(email, user_id, password)
+        return user_id
+
+    def _rehash(self, email, user_id, password):
+        password_hash = hash_password(password)
+        with self._db.connection as conn:
+            conn.execute("UPDATE users SET password_hash = ? WHERE id = ?", (password_hash, user_id))
+        with self._lock:
+            self._index[email] = (user_id, password_hash)
+
+    def _import_csv(self, path):
+        """
+        One-time import of the old plaintext users.csv, hashing each password.
+        Runs while the users table is empty; the first row per email wins.
+        """
+        conn = self._db.connection
+        if conn.execute("SELECT 1 FROM users LIMIT 1").fetchone() is not None:
+            return 0
+        with open(path, newline="", encoding="utf-8") as f:
+            rows = list(csv.reader(f))
+        # The header says "username" but the column has always held emails
+        rows = [(normalize_email(row[0]), row[1]) for row in rows[1:] if len(row) >= 2]
+        users = {}
+        for email, password in rows:
+            if email and password and email not in users:
+                users[email] = hash_password(password)
+        with conn:
+            conn.executemany("INSERT OR IGNORE INTO users (email, password_hash) VALUES (?, ?)",
+                             list(users.items()))
+        return len(users)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_user_store():
+    """The process-wide user store, created on first use."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = UserStore()
+    return _store
+
+
+# ------------------------------------------------------------
+# Cost calibration
+# ------------------------------------------------------------
+def benchmark(budget_ms=LOGIN_BUDGET_MS, log_n_range=range(10, 19), rounds=5, r=SCRYPT_R, p=SCRYPT_P):
+    """[(log_n, median ms)] per cost, stopping at the first cost over budget."""
+    results = []
+    for log_n in log_n_range:
+        salt = secrets.token_bytes(SALT_BYTES)
+        times = []
+        for _ in range(rounds):
+            start = time.perf_counter()
+            _scrypt("benchmark-password", salt, log_n, r, p)
+            times.append((time.perf_counter() - start) * 1000)
+        median = sorted(times)[len(times) // 2]
+        results.append((log_n, median))
+        if median > budget_ms:
+            break
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local user store tools.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    bench = sub.add_parser("benchmark", help="time scrypt costs against the login budget")
+    bench.add_argument("--budget-ms", type=float, default=LOGIN_BUDGET_MS)
+    bench.add_argument("--rounds", type=int, default=5)
+    sub.add_parser("import", help="import users.csv into skillbot.db (once, while empty)")
+    args = parser.parse_args(argv)
+
+    if args.command == "benchmark":
+        results = benchmark(args.budget_ms, rounds=args.rounds)
+        for log_n, ms in results:
+            mark = "✅" if ms <= args.budget_ms else "❌"
+            print(f"{mark} SKILLBOT_SCRYPT_LOG_N={log_n:<3} {ms:8.1f} ms")
+        within = [log_n for log_n, ms in results if ms <= args.budget_ms]
+        if within:
+            # Leave headroom for the rest of the request and a busy machine
+            pick = max(within[0], within[-1] - 1)
+            print(f"\nRecommended: SKILLBOT_SCRYPT_LOG_N={pick} (budget {args.budget_ms:.0f} ms)")
+        else:
+            print(f"\nEven the cheapest cost exceeds {args.budget_ms:.0f} ms; raise the budget")
+    else:
+        store = get_user_store()
+        print(f"👤 {len(store)} users in {DB_PATH}")
+
+
+if __name__ == "__main__":
+    main()